@@ -1,18 +1,50 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
+from functools import partial
 import time
 import toml
 import os
 
-# Import shared utilities
+# Import configuration and shared utilities
+from config import get_config, current_event, log_in_admin, is_admin
+from exports import EXPORT_FORMATS, available_formats
+from schema import ATTENDING_VALUES, storage_row, memory_report
+from storage import TIMESTAMP_FORMAT, RECENT_CAPACITY
 from utils import (
-    load_rsvps, save_rsvps, get_deadline_datetime, is_past_deadline,
-    get_time_until_deadline, format_time_remaining
+    load_rsvps, load_typed_rsvps, save_rsvp_edits, get_rsvp_summary, get_choice_counts,
+    get_dietary_requirements, get_recent_rsvps, count_new_rsvps, get_latest_rsvp_timestamp, search_rsvps,
+    get_seen_cursor, mark_rsvps_seen,
+    get_party_rsvps, export_rsvps, get_deadline_window, DeadlineWindow, format_time_remaining
 )
 
-# Admin password (configured in secrets.toml)
-ADMIN_PASSWORD = st.secrets["admin"]["password"]
+# Column headings for the detailed data editor
+DATA_COLUMN_LABELS = {
+    "timestamp": "Submitted",
+    "contact_name": "Contact",
+    "contact_email": "Email",
+    "contact_phone": "Phone",
+    "attending": "Status",
+    "guest_first_name": "First Name",
+    "guest_last_name": "Last Name",
+    "starter_choice": "Starter",
+    "main_choice": "Main",
+    "dessert_choice": "Dessert",
+    "dietary_requirements": "Dietary Notes",
+    "comments": "Comments",
+    "rsvp_id": "RSVP ID",
+    "submission_id": "Party ID"
+}
+
+# Rows per page offered by the data editor, and its initial view settings
+DATA_PAGE_SIZES = [25, 50, 100, 250]
+DATA_VIEW_DEFAULTS = {
+    "data_sort_column": "timestamp",
+    "data_sort_order": "Ascending",
+    "data_page_size": 50,
+    "data_page": 1,
+    "data_editor_generation": 0
+}
 
 def show_login_success():
     """Display a simple login success acknowledgment"""
@@ -35,9 +67,10 @@ def admin_login_page():
         submit_button = st.form_submit_button("Login", type="primary")
 
     if submit_button:
-        if password == ADMIN_PASSWORD:
-            # Set authentication state
-            st.session_state.authenticated = True
+        # Admin password (configured in secrets.toml)
+        if password == get_config().admin_password:
+            # Set authentication state for this event only
+            log_in_admin()
             st.session_state.just_logged_in = True
 
             # Show login success
@@ -49,9 +82,80 @@ def admin_login_page():
     st.markdown("---")
     st.info(":material/lightbulb: If you're a guest looking to submit your RSVP, please use the RSVP form instead.")
 
+def _compact_lists_toggle():
+    """Switch between detailed lists and single tables, kept across pages; returns whether compact is on"""
+    if "compact_lists" not in st.session_state:
+        st.session_state.compact_lists = get_config().compact_lists
+    st.toggle(":material/view_list: Compact view", value=st.session_state.compact_lists,
+              key="compact_lists_toggle", on_change=_set_compact_lists)
+    return st.session_state.compact_lists
+
+def _set_compact_lists():
+    st.session_state.compact_lists = st.session_state.compact_lists_toggle
+
+def _guest_names(df):
+    """Full guest name of each row, or <NA> if neither name is given"""
+    names = (df['guest_first_name'].fillna("") + " " + df['guest_last_name'].fillna("")).str.strip()
+    return names.where(names != "")
+
+def _recent_rsvps_table(recent_df, new_count):
+    """Recent RSVPs as one table, so the element count does not grow with the rows shown"""
+    attending = recent_df['attending'] == True
+    table = pd.DataFrame({
+        "new": [position < new_count for position in range(len(recent_df))],
+        "contact_name": recent_df['contact_name'],
+        "guest": _guest_names(recent_df).where(attending),
+        "attending": attending,
+        "comments": recent_df['comments'],
+        "timestamp": recent_df['timestamp']
+    })
+    st.dataframe(table, hide_index=True, width="stretch", column_config={
+        "new": st.column_config.CheckboxColumn("New"),
+        "contact_name": "Contact",
+        "guest": "Guest",
+        "attending": st.column_config.CheckboxColumn("Attending"),
+        "comments": "Comments",
+        "timestamp": st.column_config.DatetimeColumn("Submitted", format="YYYY-MM-DD")
+    })
+
+def _recent_rsvps_detailed(recent_df, new_count):
+    """Recent RSVPs as one card per row"""
+    for position, (_, row) in enumerate(recent_df.iterrows()):
+        with st.container():
+            col1, col2, col3 = st.columns([2, 1, 1])
+            with col1:
+                new_marker = " :material/fiber_new:" if position < new_count else ""
+                st.write(f"**{row['contact_name']}**{new_marker}")
+                # attending is a nullable boolean, so compare with True rather than test its truth
+                if row['attending'] == True and (pd.notna(row['guest_first_name']) or pd.notna(row['guest_last_name'])):
+                    guest_name = " ".join(name for name in (row['guest_first_name'], row['guest_last_name'])
+                                          if pd.notna(name)).strip()
+                    st.write(f":material/person: {guest_name}")
+            with col2:
+                attending = row['attending'] == True
+                status_color = ":material/check_circle:" if attending else ":material/cancel:"
+                st.write(f"{status_color} {ATTENDING_VALUES[attending]}")
+                
+                # Fixed comments handling
+                if pd.notna(row['comments']) and str(row['comments']).strip():
+                    st.write(f":material/chat_bubble: _{row['comments']}_")
+                else:
+                    st.write(":material/chat_bubble_outline: No comments")
+                    
+            with col3:
+                if pd.notna(row['timestamp']):
+                    st.write(f":material/date_range: *{row['timestamp']:%Y-%m-%d}*")  # Just the date
+
+            st.markdown("---")
+
+def _mark_recent_seen():
+    """Move the "since last visit" cursor to the newest RSVP"""
+    st.session_state.recent_cursor = get_latest_rsvp_timestamp()
+    mark_rsvps_seen(st.session_state.recent_cursor)
+
 def admin_summary_page():
     """Admin summary page"""
-    if not st.session_state.authenticated:
+    if not is_admin():
         st.error(":material/lock: Please log in to access this page.")
         st.stop()
     
@@ -63,30 +167,27 @@ def admin_summary_page():
         st.success(":material/target: Successfully accessed RSVP Summary Dashboard!")
         st.session_state.just_logged_in = False  # Reset the flag
     
-    st.title(f":material/bar_chart: RSVP Summary: (Time Zone: ({st.secrets['deadline'].get('timezone', 'UTC')})")
+    st.title(f":material/bar_chart: RSVP Summary: (Time Zone: ({get_config().timezone})")
 
     # Display deadline status
-    deadline = get_deadline_datetime()
-    if deadline:
+    window = get_deadline_window()
+    if window:
+        deadline = window.deadline
+        status = window.phase()
         col1, col2 = st.columns(2)
 
         with col1:
-            if is_past_deadline():
+            if status.phase in (DeadlineWindow.GRACE, DeadlineWindow.CLOSED):
                 st.error(f":material/schedule: **Deadline has passed**")
                 st.write(f"Deadline was: {deadline.strftime('%B %d, %Y at %I:%M %p %Z')}")
 
                 # Check if still in grace period
-                grace_hours = st.secrets["deadline"].get("grace_period_hours", 24)
-                grace_end = deadline + timedelta(hours=grace_hours)
-                now = datetime.now(deadline.tzinfo)
-
-                if now <= grace_end:
-                    st.warning(f":material/timer: Still in grace period until: {grace_end.strftime('%B %d, %Y at %I:%M %p %Z')}")
+                if status.phase == DeadlineWindow.GRACE:
+                    st.warning(f":material/timer: Still in grace period until: {window.grace_end.strftime('%B %d, %Y at %I:%M %p %Z')}")
                 else:
                     st.info(":material/block: Grace period has also ended")
             else:
-                time_remaining = get_time_until_deadline()
-                formatted_time = format_time_remaining(time_remaining)
+                formatted_time = format_time_remaining(status.time_remaining)
                 st.success(f":material/schedule: **Deadline is active**")
                 st.error(f"Deadline: {deadline.strftime('%B %d, %Y at %I:%M %p %Z')}")
                 st.info(f"Time remaining: {formatted_time}")
@@ -94,28 +195,25 @@ def admin_summary_page():
         with col2:
             # Deadline configuration display
             st.info(":material/settings: **Deadline Configuration**")
-            warning_days = st.secrets["deadline"].get("warning_days", 7)
-            grace_hours = st.secrets["deadline"].get("grace_period_hours", 24)
-
-            st.warning(f"Warning period: {warning_days} days before deadline")
-            st.warning(f"Grace period: {grace_hours} hours after deadline")
+            st.warning(f"Warning period: {window.warning_days} days before deadline")
+            st.warning(f"Grace period: {window.grace_period_hours} hours after deadline")
 
         st.markdown("---")
 
-    # Load data
-    df = load_rsvps()
+    # Load summary counts (aggregated by the store)
+    summary = get_rsvp_summary()
     
-    if not df.empty:
+    if summary['total_rows'] > 0:
         # Summary statistics
         st.write("**RSVP Overview**")
         
         # Main metrics
         col1, col2, col3, col4 = st.columns(4)
         
-        total_contacts = df['contact_name'].nunique()
-        attending_contacts = df[df['attending'] == 'Yes']['contact_name'].nunique()
-        not_attending_contacts = df[df['attending'] == 'No']['contact_name'].nunique()
-        total_guests = len(df[df['attending'] == 'Yes'])
+        total_contacts = summary['total_contacts']
+        attending_contacts = summary['attending_contacts']
+        not_attending_contacts = summary['not_attending_contacts']
+        total_guests = summary['total_guests']
         
         with col1:
             st.metric("Total Responses", total_contacts)
@@ -137,36 +235,33 @@ def admin_summary_page():
         
         # Recent RSVPs
         #st.subheader("Recent RSVPs")
-        recent_df = df.sort_values('timestamp', ascending=False).head(10)
+        if "recent_cursor" not in st.session_state:
+            # Rows submitted since the last visit are shown as new for this whole
+            # session; the next visit counts from the start of this one
+            st.session_state.recent_cursor = get_seen_cursor()
+            mark_rsvps_seen(get_latest_rsvp_timestamp())
+        new_count = count_new_rsvps(st.session_state.recent_cursor)
+        recent_df = get_recent_rsvps(min(get_config().recent_rsvps, RECENT_CAPACITY))
         st.divider()
-        for _, row in recent_df.iterrows():
-            with st.container():
-                col1, col2, col3 = st.columns([2, 1, 1])
-                with col1:
-                    st.write(f"**{row['contact_name']}**")
-                    if row['attending'] == 'Yes' and (row.get('guest_first_name') or row.get('guest_last_name')):
-                        guest_name = f"{row.get('guest_first_name', '')} {row.get('guest_last_name', '')}".strip()
-                        st.write(f":material/person: {guest_name}")
-                with col2:
-                    status_color = ":material/check_circle:" if row['attending'] == 'Yes' else ":material/cancel:"
-                    st.write(f"{status_color} {row['attending']}")
-                    
-                    # Fixed comments handling
-                    if pd.notna(row['comments']) and str(row['comments']).strip():
-                        st.write(f":material/chat_bubble: _{row['comments']}_")
-                    else:
-                        st.write(":material/chat_bubble_outline: No comments")
-                        
-                with col3:
-                    st.write(f":material/date_range: *{row['timestamp'].split()[0]}*")  # Just the date
-
-                st.markdown("---")
+
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            more = "+" if new_count >= RECENT_CAPACITY else ""
+            st.write(f":material/notifications: **{new_count}{more} new** since your last visit")
+        with col2:
+            st.button(":material/done_all: Mark as seen", on_click=_mark_recent_seen, disabled=not new_count)
+
+        # The feed is newest first, so the new rows are the first new_count rows
+        if _compact_lists_toggle():
+            _recent_rsvps_table(recent_df, new_count)
+        else:
+            _recent_rsvps_detailed(recent_df, new_count)
     else:
         st.info(":material/inbox: No RSVPs have been submitted yet.")
 
 def admin_menu_page():
     """Admin menu planning page"""
-    if not st.session_state.authenticated:
+    if not is_admin():
         st.error(":material/lock: Please log in to access this page.")
         st.stop()
     
@@ -175,25 +270,17 @@ def admin_menu_page():
     
     st.title(":material/restaurant: Menu Planning")
 
-    # Load data
-    df = load_rsvps()
-
-    # Check if dataframe is empty or missing required columns
-    if df.empty or 'attending' not in df.columns:
-        st.info(":material/inbox: No attending guests yet to display menu planning data.")
-        return
-
-    total_guests = len(df[df['attending'] == 'Yes'])
+    # Load summary counts (aggregated by the store)
+    summary = get_rsvp_summary()
+    total_guests = summary['total_guests']
 
     if total_guests > 0:
-        attending_df = df[df['attending'] == 'Yes']
-        
         # Menu summary in columns
         col1, col2, col3 = st.columns(3)
         
         with col1:
             st.subheader(":material/restaurant: Starters")
-            starter_counts = attending_df['starter_choice'].value_counts()
+            starter_counts = get_choice_counts('starter_choice')
             for starter, count in starter_counts.items():
                 st.write(f"**{starter}:** {count} guests")
             
@@ -203,7 +290,7 @@ def admin_menu_page():
         
         with col2:
             st.subheader(":material/dinner_dining: Main Courses")
-            main_counts = attending_df['main_choice'].value_counts()
+            main_counts = get_choice_counts('main_choice')
             for main, count in main_counts.items():
                 st.write(f"**{main}:** {count} guests")
             
@@ -213,7 +300,7 @@ def admin_menu_page():
         
         with col3:
             st.subheader(":material/cake: Desserts")
-            dessert_counts = attending_df['dessert_choice'].value_counts()
+            dessert_counts = get_choice_counts('dessert_choice')
             for dessert, count in dessert_counts.items():
                 st.write(f"**{dessert}:** {count} guests")
             
@@ -223,21 +310,73 @@ def admin_menu_page():
         
         # Dietary requirements
         st.subheader(":material/health_and_safety: Dietary Requirements & Allergies")
-        dietary_df = attending_df[attending_df['dietary_requirements'].notna() & 
-                                (attending_df['dietary_requirements'] != '')]
-        
-        if not dietary_df.empty:
-            for _, row in dietary_df.iterrows():
-                guest_name = f"{row.get('guest_first_name', '')} {row.get('guest_last_name', '')}".strip()
-                st.write(f"**{guest_name}:** {row['dietary_requirements']}")
+        if summary['dietary_count'] > 0:
+            dietary_df = get_dietary_requirements()
+            if _compact_lists_toggle():
+                # One table however many guests have requirements. The same notes
+                # recur across guests, so sending them as a categorical (one Arrow
+                # dictionary) keeps the payload smaller than one write per guest
+                st.dataframe(
+                    pd.DataFrame({"guest": _guest_names(dietary_df),
+                                  "dietary_requirements": dietary_df['dietary_requirements'].astype("category")}),
+                    hide_index=True, width="stretch",
+                    column_config={"guest": "Guest", "dietary_requirements": "Dietary Notes"}
+                )
+            else:
+                for _, row in dietary_df.iterrows():
+                    guest_name = f"{row.get('guest_first_name', '')} {row.get('guest_last_name', '')}".strip()
+                    st.write(f"**{guest_name}:** {row['dietary_requirements']}")
         else:
             st.write("No special dietary requirements reported.")
     else:
         st.info("No attending guests yet to display menu planning data.")
 
+def _reset_data_editor():
+    """Start a new data editor, dropping unsaved edits that refer to the old rows"""
+    st.session_state.data_editor_generation += 1
+
+def _reset_data_page():
+    """Go back to the first page of the data editor, e.g. when the search changes"""
+    st.session_state.data_page = 1
+    _reset_data_editor()
+
+def _data_page_view(filtered_df):
+    """Sort and paginate the data editor rows, with the settings kept in session state"""
+    for key, value in DATA_VIEW_DEFAULTS.items():
+        if key not in st.session_state:
+            st.session_state[key] = value
+
+    sort_col, order_col, size_col, page_col = st.columns([2, 1.5, 1, 1])
+    with sort_col:
+        st.selectbox("Sort by:", list(DATA_COLUMN_LABELS), key="data_sort_column",
+                     format_func=DATA_COLUMN_LABELS.get, on_change=_reset_data_page)
+    with order_col:
+        st.radio("Order:", ["Ascending", "Descending"], key="data_sort_order",
+                 horizontal=True, on_change=_reset_data_page)
+    with size_col:
+        st.selectbox("Rows per page:", DATA_PAGE_SIZES, key="data_page_size", on_change=_reset_data_page)
+
+    page_size = st.session_state.data_page_size
+    total_pages = max(1, -(-len(filtered_df) // page_size))
+    # Rows may have been removed since the page number was chosen
+    st.session_state.data_page = min(max(1, st.session_state.data_page), total_pages)
+    with page_col:
+        st.number_input(f"Page (of {total_pages}):", min_value=1, max_value=total_pages,
+                        step=1, key="data_page", on_change=_reset_data_editor)
+
+    sort_column = st.session_state.data_sort_column
+    if sort_column in filtered_df.columns:
+        # Stable sort keeps submission order between equal values
+        filtered_df = filtered_df.sort_values(sort_column, ascending=st.session_state.data_sort_order == "Ascending",
+                                              kind="stable", na_position="last")
+
+    start = (st.session_state.data_page - 1) * page_size
+    page_df = filtered_df.iloc[start:start + page_size]
+    return page_df, start + 1, start + len(page_df)
+
 def admin_data_page():
     """Admin detailed data page"""
-    if not st.session_state.authenticated:
+    if not is_admin():
         st.error(":material/lock: Please log in to access this page.")
         st.stop()
     
@@ -246,84 +385,107 @@ def admin_data_page():
     
     st.title(":material/description: Detailed Data")
     
-    # Load data
-    df = load_rsvps()
+    # Load data with native column types, so the editor shows checkboxes, menu
+    # dropdowns and date pickers and sorts by value rather than text
+    df = load_typed_rsvps()
     
     if not df.empty:
         # Export functionality
         st.write("**:material/download: Export Data**")
+        export_format = st.selectbox("Format:", available_formats(),
+                                     format_func=lambda key: EXPORT_FORMATS[key][0], key="export_format")
+        label, extension, mime = EXPORT_FORMATS[export_format]
         col1, col2 = st.columns(2)
         
+        # Exports are only generated when a button is clicked, and then cached
+        # until the data changes. The click is handled outside this session, so
+        # the event is passed along
         with col1:
-            csv = df.to_csv(index=False)
             st.download_button(
-                label=":material/description: Download All Data (CSV)",
-                data=csv,
-                file_name=f"wedding_rsvps_all_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
+                label=f":material/description: Download All Data ({label})",
+                data=partial(export_rsvps, "all", export_format, current_event()),
+                file_name=f"wedding_rsvps_all_{datetime.now().strftime('%Y%m%d')}.{extension}",
+                mime=mime,
+                on_click="ignore"
             )
         
         with col2:
             # Export only attending guests
-            attending_df = df[df['attending'] == 'Yes']
-            if not attending_df.empty:
-                attending_csv = attending_df.to_csv(index=False)
+            if get_rsvp_summary()['total_guests'] > 0:
                 st.download_button(
-                    label=":material/check_circle: Download Attending Only (CSV)",
-                    data=attending_csv,
-                    file_name=f"wedding_rsvps_attending_{datetime.now().strftime('%Y%m%d')}.csv",
-                    mime="text/csv"
+                    label=f":material/check_circle: Download Attending Only ({label})",
+                    data=partial(export_rsvps, "attending", export_format, current_event()),
+                    file_name=f"wedding_rsvps_attending_{datetime.now().strftime('%Y%m%d')}.{extension}",
+                    mime=mime,
+                    on_click="ignore"
                 )
         
         # Search and filter
         st.write("**:material/search: Search & Filter**")
-        search_term = st.text_input("Search by contact name or guest name:")
+        search_term = st.text_input("Search by name, email or phone:", on_change=_reset_data_page)
         
         filtered_df = df
         if search_term:
-            filtered_df = df[
-                df['contact_name'].str.contains(search_term, case=False, na=False) |
-                df['guest_first_name'].str.contains(search_term, case=False, na=False) |
-                df['guest_last_name'].str.contains(search_term, case=False, na=False)
-            ]
+            # Rows appended since df was loaded can appear in the results; skip them
+            positions = [position for position in search_rsvps(search_term) if position < len(df)]
+            filtered_df = df.iloc[positions]
         
         # Display data table
         st.write("**:material/table_view: Complete RSVP Data**")
         if not filtered_df.empty:
-            edited_df = st.data_editor(
-                filtered_df,
+            page_df, first_row, last_row = _data_page_view(filtered_df)
+
+            # Only the visible page is sent to the browser; edits are saved by rsvp_id
+            editor_key = f"data_editor_{st.session_state.data_editor_generation}"
+            st.data_editor(
+                page_df,
+                key=editor_key,
                 width="content",
+                num_rows="dynamic",
                 column_config={
-                    "timestamp": "Submitted",
-                    "contact_name": "Contact",
-                    "contact_email": "Email",
-                    "contact_phone": "Phone",
-                    "attending": "Status",
-                    "guest_first_name": "First Name",
-                    "guest_last_name": "Last Name",
-                    "starter_choice": "Starter",
-                    "main_choice": "Main",
-                    "dessert_choice": "Dessert",
-                    "dietary_requirements": "Dietary Notes",
-                    "comments": "Comments"
+                    **DATA_COLUMN_LABELS,
+                    # Ids are assigned by the store and never edited
+                    "rsvp_id": st.column_config.TextColumn("RSVP ID", disabled=True),
+                    "submission_id": st.column_config.TextColumn("Party ID", disabled=True)
                 }
             )
 
-            st.write(f"Showing {len(filtered_df)} of {len(df)} total responses")
+            st.write(f"Showing {first_row}-{last_row} of {len(filtered_df)} matching responses "
+                     f"({len(df)} total)")
+            st.caption("Save your changes before moving to another page.")
 
             # Save button to persist changes
             if st.button(":material/save: Save Changes", type="primary"):
-                # Update the original dataframe with edited values
-                if search_term:
-                    # If filtered, update only the filtered rows in the original df
-                    df.update(edited_df)
-                else:
-                    # If not filtered, replace the entire dataframe
-                    df = edited_df
+                # The editor records changes by position in page_df; map them to rsvp_ids
+                changes = st.session_state[editor_key]
+                rsvp_ids = page_df['rsvp_id']
+                config = get_config()
+                updated = {rsvp_ids.iloc[int(position)]: storage_row(values, config)
+                           for position, values in changes["edited_rows"].items()}
+                deleted = [rsvp_ids.iloc[position] for position in changes["deleted_rows"]]
+                added = [dict({"timestamp": datetime.now().strftime(TIMESTAMP_FORMAT)}, **storage_row(row, config))
+                         for row in changes["added_rows"]]
 
-                save_rsvps(df)
+                save_rsvp_edits(updated, deleted, added)
+                _reset_data_editor()
                 st.success(":material/check_circle: Changes saved successfully!")
                 st.rerun()
+
+            # Every guest of one party, looked up by its submission_id
+            parties = page_df.drop_duplicates('submission_id').set_index('submission_id')['contact_name']
+            submission_id = st.selectbox(
+                "Show all guests of a party:",
+                list(parties.index),
+                index=None,
+                placeholder="Choose a party on this page",
+                format_func=lambda value: parties.get(value, value)
+            )
+            if submission_id:
+                st.dataframe(get_party_rsvps(submission_id), hide_index=True, column_config=DATA_COLUMN_LABELS)
+
+            with st.expander(":material/memory: Memory footprint"):
+                report = memory_report({"Loaded": load_rsvps(), "Typed": df})
+                st.dataframe(report.map(lambda size: f"{size / 1024:,.1f} KB"))
         else:
             st.write("No data matches your search criteria.")
     else:
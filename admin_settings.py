@@ -1,21 +1,29 @@
 import streamlit as st
 import toml
 import os
+import tempfile
 from datetime import datetime
 
+from config import validate, reload_config, get_config_error, get_config_file, is_admin
+
 def admin_settings_page():
     """Admin settings page for editing secrets.toml"""
-    if not st.session_state.get('authenticated', False):
+    if not is_admin():
         st.error(":material/lock: Please log in to access this page.")
         st.stop()
 
     main_col1, main_col2, main_col3 = st.columns([1, 4, 1])
     with main_col2:
         st.title(":material/settings: Settings Configuration")
-        st.info(":material/info: Edit your secrets.toml configuration below. Changes require app restart to take effect.")
+        st.info(":material/info: Edit your secrets.toml configuration below. Saved changes take effect immediately.")
+
+        # Path to the secrets file of the current event
+        secrets_path = get_config_file().path
 
-        # Path to secrets file
-        secrets_path = os.path.join(".streamlit", "secrets.toml")
+        # Show why the last change made to the file on disk was not applied
+        config_error = get_config_error()
+        if config_error:
+            st.warning(f":material/warning: The file on disk has errors, so the previous settings are still in use: {config_error}")
 
         if not os.path.exists(secrets_path):
             st.error(f":material/error: secrets.toml file not found at {secrets_path}")
@@ -141,27 +149,38 @@ def admin_settings_page():
         col1, col2, col3 = st.columns([1, 1, 4])
         with col1:
             if st.button(":material/save: Save Changes", type="primary", use_container_width=True):
-                try:
-                    # Create backup
-                    backup_path = secrets_path + f".backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                    with open(secrets_path, 'r') as f:
-                        backup_content = f.read()
-                    with open(backup_path, 'w') as f:
-                        f.write(backup_content)
-
-                    # Write updated secrets
-                    with open(secrets_path, 'w') as f:
-                        toml.dump(secrets, f)
-
-                    st.success(f":material/check_circle: Settings saved! Backup created at {backup_path}")
-                    st.info(":material/restart_alt: **Important:** Restart the Streamlit app for changes to take effect.")
-
-                    # Clear the edited state
-                    if 'edited_secrets' in st.session_state:
-                        del st.session_state.edited_secrets
-
-                except Exception as e:
-                    st.error(f":material/error: Error saving settings: {str(e)}")
+                problems = validate(secrets)
+                if problems:
+                    st.error(":material/error: Settings were not saved:")
+                    for problem in problems:
+                        st.error(f"• {problem}")
+                else:
+                    try:
+                        # Create backup
+                        backup_path = secrets_path + f".backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                        with open(secrets_path, 'r') as f:
+                            backup_content = f.read()
+                        with open(backup_path, 'w') as f:
+                            f.write(backup_content)
+
+                        # Write updated secrets to a temp file and swap it in atomically
+                        directory = os.path.dirname(os.path.abspath(secrets_path))
+                        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".secrets_", suffix=".tmp")
+                        with os.fdopen(fd, 'w') as f:
+                            toml.dump(secrets, f)
+                        os.replace(tmp_path, secrets_path)
+
+                        # Apply the new settings to every session
+                        reload_config()
+
+                        st.success(f":material/check_circle: Settings saved and applied! Backup created at {backup_path}")
+
+                        # Clear the edited state
+                        if 'edited_secrets' in st.session_state:
+                            del st.session_state.edited_secrets
+
+                    except Exception as e:
+                        st.error(f":material/error: Error saving settings: {str(e)}")
 
         with col2:
             if st.button(":material/refresh: Reload File", use_container_width=True):
@@ -0,0 +1,225 @@
+import pandas as pd
+import os
+import sys
+import json
+import tempfile
+import threading
+
+# Menu columns counted per choice
+CHOICE_COLUMNS = ["starter_choice", "main_choice", "dessert_choice"]
+
+# Counters that depend on the rows of each contact
+CONTACT_COUNTERS = ["total_contacts", "attending_contacts", "not_attending_contacts"]
+
+def _is_blank(value):
+    """Check for a missing or empty cell, as written by an empty CSV field"""
+    return value is None or (not isinstance(value, str) and pd.isna(value)) or value == ""
+
+class RsvpAggregates:
+    """Counters behind the summary and menu dashboards, updated on every write
+
+    The sidecar file holds only the totals and the per-choice counts, so
+    saving it costs the same however many contacts there are. Telling
+    whether a row changes the number of (attending) contacts needs the rows
+    of every contact; that map is kept in memory only. Rows counted without
+    it leave the contact counters pending (None) until count_contacts()
+    recounts them from the stored rows.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.total_rows = 0
+        self.total_guests = 0
+        self.dietary_count = 0
+        self.total_contacts = 0
+        self.attending_contacts = 0
+        self.not_attending_contacts = 0
+        # contact name -> [attending rows, not attending rows, other rows], or None when
+        # this process has not counted the contacts of the current rows
+        self.contacts = {}
+        # menu column -> {choice: attending guests}
+        self.choices = {column: {} for column in CHOICE_COLUMNS}
+        # Held while counters change, as stores update them in place
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df):
+        """Recompute every counter from a full RSVP dataframe"""
+        aggregates = cls()
+        if not df.empty:
+            aggregates.add_rows(df.to_dict('records'))
+        return aggregates
+
+    def add_rows(self, rsvp_rows):
+        """Count newly appended rows"""
+        with self._lock:
+            for row in rsvp_rows:
+                self._add_row(row)
+
+    def remove_rows(self, rsvp_rows):
+        """Uncount rows that were deleted, or the old values of edited rows"""
+        with self._lock:
+            for row in rsvp_rows:
+                self._add_row(row, -1)
+
+    def contacts_pending(self):
+        """Whether the contact counters wait to be recounted (see count_contacts())"""
+        return self.total_contacts is None
+
+    @classmethod
+    def count_contacts(cls, df):
+        """Contact counters of a full RSVP dataframe, for set_contacts()"""
+        return cls.from_frame(df[['contact_name', 'attending']] if not df.empty else df)
+
+    def set_contacts(self, contacts):
+        """Take the contact map and counters of count_contacts() for the same rows"""
+        with self._lock:
+            self.contacts = contacts.contacts
+            for key in CONTACT_COUNTERS:
+                setattr(self, key, getattr(contacts, key))
+
+    def _add_row(self, row, delta=1):
+        self.total_rows += delta
+        attending = row.get('attending')
+        contact_name = row.get('contact_name')
+
+        if not _is_blank(contact_name):
+            if self.contacts is None:
+                # Not known whether this row adds or removes a contact
+                for key in CONTACT_COUNTERS:
+                    setattr(self, key, None)
+            else:
+                counts = self.contacts.get(str(contact_name))
+                if counts is None:
+                    counts = self.contacts[str(contact_name)] = [0, 0, 0]
+                    self.total_contacts += 1
+                slot = {"Yes": 0, "No": 1}.get(attending, 2)
+                counts[slot] += delta
+                # A contact counts as attending (or not) while it has at least one such row
+                if slot == 0 and counts[slot] == (1 if delta > 0 else 0):
+                    self.attending_contacts += delta
+                elif slot == 1 and counts[slot] == (1 if delta > 0 else 0):
+                    self.not_attending_contacts += delta
+                if not any(counts):
+                    del self.contacts[str(contact_name)]
+                    self.total_contacts -= 1
+
+        if attending != "Yes":
+            return
+
+        self.total_guests += delta
+        for column in CHOICE_COLUMNS:
+            choice = row.get(column)
+            if not _is_blank(choice):
+                column_counts = self.choices[column]
+                column_counts[str(choice)] = column_counts.get(str(choice), 0) + delta
+                if column_counts[str(choice)] == 0:
+                    del column_counts[str(choice)]
+
+        if not _is_blank(row.get('dietary_requirements')):
+            self.dietary_count += delta
+
+    def summary(self):
+        """Contact and guest counts for the summary dashboard"""
+        return {
+            "total_rows": self.total_rows,
+            "total_contacts": self.total_contacts,
+            "attending_contacts": self.attending_contacts,
+            "not_attending_contacts": self.not_attending_contacts,
+            "total_guests": self.total_guests,
+            "dietary_count": self.dietary_count
+        }
+
+    def choice_counts(self, column):
+        """Attending guests per menu choice, most popular first"""
+        if column not in CHOICE_COLUMNS:
+            raise ValueError(f"Unknown menu column: {column}")
+
+        with self._lock:
+            counts = pd.Series(dict(self.choices[column]), dtype="int64", name="count")
+        counts.index.name = column
+        return counts.sort_values(ascending=False)
+
+    def differences(self, other):
+        """Describe every counter that differs from another set of aggregates"""
+        problems = []
+        for key, value in self.summary().items():
+            other_value = other.summary()[key]
+            # Pending contact counters are recounted on the next read, not wrong
+            if value is not None and other_value is not None and value != other_value:
+                problems.append(f"{key}: {value} != {other_value}")
+        for column in CHOICE_COLUMNS:
+            if self.choices[column] != other.choices[column]:
+                problems.append(f"{column}: {self.choices[column]} != {other.choices[column]}")
+        return problems
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "version": self.version,
+                "total_rows": self.total_rows,
+                "total_guests": self.total_guests,
+                "dietary_count": self.dietary_count,
+                "total_contacts": self.total_contacts,
+                "attending_contacts": self.attending_contacts,
+                "not_attending_contacts": self.not_attending_contacts,
+                "choices": {column: dict(counts) for column, counts in self.choices.items()}
+            }
+
+    @classmethod
+    def from_dict(cls, data):
+        if "contacts" in data:
+            # Written with the per-contact map: load() returns None and the counters are rebuilt
+            raise ValueError("Outdated contact counters")
+        aggregates = cls()
+        for key in ["version", "total_rows", "total_guests", "dietary_count"] + CONTACT_COUNTERS:
+            setattr(aggregates, key, data[key])
+        # The contacts of the sidecar's rows are not known in this process
+        aggregates.contacts = None
+        aggregates.choices = {column: dict(data["choices"].get(column, {})) for column in CHOICE_COLUMNS}
+        return aggregates
+
+    @classmethod
+    def load(cls, path):
+        """Read the sidecar file, returning None if it is missing or unreadable"""
+        try:
+            with open(path) as f:
+                return cls.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, path):
+        """Write the sidecar file atomically"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".stats_", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.to_dict(), f)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+if __name__ == "__main__":
+    import argparse
+    import toml
+    from storage import open_store
+
+    parser = argparse.ArgumentParser(description="Rebuild or check the RSVP dashboard counters")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--secrets", default=os.path.join(".streamlit", "secrets.toml"),
+                        help="Path to secrets.toml (default: .streamlit/secrets.toml)")
+    args = parser.parse_args()
+
+    store = open_store(toml.load(args.secrets)["files"])
+
+    if args.command == "rebuild":
+        aggregates = store.rebuild_aggregates()
+        print(f"Rebuilt {store.stats_path} from {aggregates.total_rows} rows")
+    else:
+        problems = store.check_aggregates()
+        for problem in problems:
+            print(problem)
+        print("Counters are consistent" if not problems else f"{len(problems)} counters differ")
+        sys.exit(1 if problems else 0)
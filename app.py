@@ -1,5 +1,6 @@
 import streamlit as st
-from datetime import datetime, timedelta
+import uuid
+from datetime import datetime
 
 # Import admin functions
 from admin import admin_login_page, admin_summary_page, admin_menu_page, admin_data_page
@@ -8,104 +9,165 @@ from admin_settings import admin_settings_page
 # Import event info page
 from event_info import event_info_page
 
-# Import shared utilities
+# Import configuration and shared utilities
+from config import get_config, select_event, current_event, is_admin, log_out_admin, ConfigError, EVENT_PARAM
 from utils import (
-    save_rsvp, get_deadline_datetime, is_past_deadline,
-    is_within_grace_period, is_within_warning_period, get_time_until_deadline,
-    format_time_remaining
+    commit_rsvps, new_submission_token, get_deadline_window, DeadlineWindow, format_time_remaining
 )
+from writer import WriteQueueFull
+from images import show_image
+
+# Select the hosted event from ?event=<name>. Switching pages drops the query
+# parameter, so the session keeps its event and the parameter is put back
+event_name = st.query_params.get(EVENT_PARAM, current_event())
+try:
+    select_event(event_name)
+except ConfigError as e:
+    st.error(f":material/error: {e}")
+    st.stop()
+if event_name:
+    st.query_params[EVENT_PARAM] = event_name
 
 # Configure the page
+config = get_config()
 st.set_page_config(
-    page_title=st.secrets["wedding"]["page_title"],
-    page_icon=st.secrets["wedding"]["page_icon"],
+    page_title=config.page_title,
+    page_icon=config.page_icon,
     initial_sidebar_state="collapsed",
     layout="wide"
 )
 
 # Constants
-MAX_GUESTS_FOR_CLEANUP = 20  # Maximum number of guests to clear from session state
+GUEST_FIELDS = ["first_name", "last_name", "starter", "main", "dessert", "dietary"]  # Fields of a guest record
 COLUMN_RATIO_HEADER = [2.5, 1]  # Column ratio for header layout
 COLUMN_RATIO_CONTACT = [3, 4, 2]  # Column ratio for contact information
 COLUMN_RATIO_GUEST = [3, 1]  # Column ratio for guest details
 COLUMN_RATIO_MENU = [1.2, 1.8, 1.1]  # Column ratio for menu selections
 
-# Menu options
-STARTERS = st.secrets["menu"]["starters"]
-MAINS = st.secrets["menu"]["mains"]
-DESSERTS = st.secrets["menu"]["desserts"]
+def new_guest():
+    """An empty guest record, with a stable id for its widget keys"""
+    return dict.fromkeys(GUEST_FIELDS, "") | {'id': uuid.uuid4().hex}
+
+def _guest_key(guest_id, field):
+    """Widget key of one field of a guest record"""
+    return f"guest_{guest_id}_{field}"
 
 def initialize_session_state():
     """Initialize session state variables"""
     defaults = {
-        'guests': [{}],
+        'guests': [new_guest()],
         'form_submitted': False,
         'submission_in_progress': False,
         'authenticated': False,
-        'form_data': {}
+        'form_data': {},
+        'submission_messages': [],
+        'submission_token': None
     }
 
     for key, value in defaults.items():
         if key not in st.session_state:
             st.session_state[key] = value
 
+    # Every rendered form gets its own idempotency token, so submitting it
+    # twice (a double click, a retry after an error) stores the party once
+    if not st.session_state.submission_token:
+        st.session_state.submission_token = new_submission_token()
+
 def add_guest():
     """Add a new guest to the session state"""
     if not st.session_state.submission_in_progress:
-        st.session_state.guests.append({})
+        st.session_state.guests.append(new_guest())
 
-def remove_guest(index):
+def remove_guest(guest_id):
     """Remove a guest from the session state"""
     if len(st.session_state.guests) > 1 and not st.session_state.submission_in_progress:
-        st.session_state.guests.pop(index)
+        st.session_state.guests = [guest for guest in st.session_state.guests if guest['id'] != guest_id]
+
+def update_guest(guest_id, field):
+    """Copy a guest widget's value into the guest's record"""
+    for guest in st.session_state.guests:
+        if guest['id'] == guest_id:
+            guest[field] = st.session_state[_guest_key(guest_id, field)]
 
 def reset_form():
     """Reset the form after submission"""
     # Reset main form state
     form_state_reset = {
-        'guests': [{}],
+        'guests': [new_guest()],
         'form_submitted': False,
         'submission_in_progress': False,
-        'form_data': {}
+        'form_data': {},
+        'submission_messages': [],
+        'submission_token': new_submission_token()
     }
 
     for key, value in form_state_reset.items():
         st.session_state[key] = value
 
-    # Clear form fields
+    # Clear form fields. The new guest records have new widget keys, and
+    # Streamlit drops the state of the old guests' widgets once they are gone
     form_keys = ["attending", "contact_name", "contact_email", "contact_phone", "comments"]
-
-    # Add guest-specific fields
-    for i in range(MAX_GUESTS_FOR_CLEANUP):
-        form_keys.extend([
-            f"guest_first_name_{i}", f"guest_last_name_{i}",
-            f"starter_{i}", f"main_{i}", f"dessert_{i}", f"dietary_{i}"
-        ])
-
-    # Remove the keys from session state
     for key in form_keys:
         st.session_state.pop(key, None)
 
+def notify(kind, message):
+    """Queue a message ("error", "warning" or "info") for show_submission_messages()"""
+    st.session_state.submission_messages.append((kind, message))
+
+def show_submission_messages():
+    """Show the messages of the last submission once"""
+    for kind, message in st.session_state.submission_messages:
+        getattr(st, kind)(message)
+    st.session_state.submission_messages = []
+
+def submit_rsvp():
+    """Submit button callback: collect the form and process it before the page is rendered
+
+    Running in the callback lets the same script run show the confirmation
+    or the errors, with no extra reruns. Clicks that arrive while a
+    submission is being processed, or after it was saved, are ignored.
+    """
+    if st.session_state.submission_in_progress or st.session_state.form_submitted:
+        return
+
+    # Store form data in session state before processing
+    st.session_state.form_data = {
+        'attending': st.session_state.get('attending'),
+        'contact_name': st.session_state.get('contact_name', ''),
+        'contact_email': st.session_state.get('contact_email', ''),
+        'contact_phone': st.session_state.get('contact_phone', ''),
+        'comments': st.session_state.get('comments', ''),
+        'guests': [dict(guest) for guest in st.session_state.guests]
+    }
+
+    st.session_state.submission_in_progress = True
+    try:
+        process_submission()
+    finally:
+        st.session_state.submission_in_progress = False
+
 def process_submission():
     """Process the RSVP submission"""
     form_data = st.session_state.form_data
 
-    # Check deadline enforcement first
-    if is_past_deadline() and not is_within_grace_period():
-        st.error(":material/block: RSVP deadline has passed. Submissions are no longer accepted.")
-        st.info("Please contact the wedding couple directly if you need to make changes to your RSVP.")
+    # Check deadline enforcement first (one clock read for every check)
+    window = get_deadline_window()
+    status = window.phase() if window else None
+
+    if status and status.phase == DeadlineWindow.CLOSED:
+        notify("error", ":material/block: RSVP deadline has passed. Submissions are no longer accepted.")
+        notify("info", "Please contact the wedding couple directly if you need to make changes to your RSVP.")
         st.session_state.submission_in_progress = False
         return False
 
     # Show warning if in grace period
-    if is_within_grace_period():
-        st.warning(":material/timer: Submitting during grace period - deadline has passed but submissions are still being accepted.")
+    if status and status.phase == DeadlineWindow.GRACE:
+        notify("warning", ":material/timer: Submitting during grace period - deadline has passed but submissions are still being accepted.")
 
     # Show urgency warning if within warning period
-    if is_within_warning_period():
-        time_remaining = get_time_until_deadline()
-        formatted_time = format_time_remaining(time_remaining)
-        st.warning(f":material/schedule: Submitting close to deadline - {formatted_time} remaining!")
+    if status and status.phase == DeadlineWindow.WARNING:
+        formatted_time = format_time_remaining(status.time_remaining)
+        notify("warning", f":material/schedule: Submitting close to deadline - {formatted_time} remaining!")
 
     # Validation
     errors = []
@@ -114,28 +176,22 @@ def process_submission():
         errors.append("Primary contact name is required")
     
     if form_data.get('attending') == "Yes, I/we will attend":
-        for i, _ in enumerate(st.session_state.guests):
-            guest_first_name = form_data.get(f"guest_first_name_{i}", "")
-            guest_last_name = form_data.get(f"guest_last_name_{i}", "")
-            starter = form_data.get(f"starter_{i}", "")
-            main = form_data.get(f"main_{i}", "")
-            dessert = form_data.get(f"dessert_{i}", "")
-
-            if not guest_first_name.strip():
+        for i, guest in enumerate(form_data.get('guests', [])):
+            if not guest['first_name'].strip():
                 errors.append(f"Guest {i + 1} first name is required")
-            if not guest_last_name.strip():
+            if not guest['last_name'].strip():
                 errors.append(f"Guest {i + 1} last name is required")
-            if not starter:
+            if not guest['starter']:
                 errors.append(f"Guest {i + 1} starter choice is required")
-            if not main:
+            if not guest['main']:
                 errors.append(f"Guest {i + 1} main course choice is required")
-            if not dessert:
+            if not guest['dessert']:
                 errors.append(f"Guest {i + 1} dessert choice is required")
     
     if errors:
-        st.error("Please fix the following errors:")
+        notify("error", "Please fix the following errors:")
         for error in errors:
-            st.error(f"• {error}")
+            notify("error", f"• {error}")
         
         # Reset submission state on error
         st.session_state.submission_in_progress = False
@@ -146,26 +202,26 @@ def process_submission():
     
     try:
         if form_data.get('attending') == "Yes, I/we will attend":
-            # Save each guest as a separate row
-            for i, _ in enumerate(st.session_state.guests):
-                rsvp_data = {
+            # One row per guest, committed together
+            rsvp_rows = []
+            for guest in form_data.get('guests', []):
+                rsvp_rows.append({
                     "timestamp": timestamp,
                     "contact_name": form_data.get('contact_name', ''),
                     "contact_email": form_data.get('contact_email', ''),
                     "contact_phone": form_data.get('contact_phone', ''),
                     "attending": "Yes",
-                    "guest_first_name": form_data.get(f"guest_first_name_{i}", ""),
-                    "guest_last_name": form_data.get(f"guest_last_name_{i}", ""),
-                    "starter_choice": form_data.get(f"starter_{i}", ""),
-                    "main_choice": form_data.get(f"main_{i}", ""),
-                    "dessert_choice": form_data.get(f"dessert_{i}", ""),
-                    "dietary_requirements": form_data.get(f"dietary_{i}", ""),
+                    "guest_first_name": guest['first_name'],
+                    "guest_last_name": guest['last_name'],
+                    "starter_choice": guest['starter'],
+                    "main_choice": guest['main'],
+                    "dessert_choice": guest['dessert'],
+                    "dietary_requirements": guest['dietary'],
                     "comments": form_data.get('comments', '')
-                }
-                save_rsvp(rsvp_data)
+                })
         else:
-            # Save single "not attending" entry
-            rsvp_data = {
+            # Single "not attending" entry
+            rsvp_rows = [{
                 "timestamp": timestamp,
                 "contact_name": form_data.get('contact_name', ''),
                 "contact_email": form_data.get('contact_email', ''),
@@ -178,45 +234,116 @@ def process_submission():
                 "dessert_choice": "",
                 "dietary_requirements": "",
                 "comments": form_data.get('comments', '')
-            }
-            save_rsvp(rsvp_data)
+            }]
+
+        commit_rsvps(rsvp_rows, st.session_state.submission_token)
         
         # Mark as successfully submitted
         st.session_state.form_submitted = True
         st.session_state.submission_in_progress = False
         return True
-        
+
+    except WriteQueueFull:
+        # Back-pressure: many guests are submitting at once
+        notify("error", ":material/hourglass_top: We're receiving a lot of RSVPs right now. Please try submitting again in a moment.")
+        st.session_state.submission_in_progress = False
+        return False
+
     except Exception as e:
-        st.error(f"An error occurred while saving your RSVP: {str(e)}")
+        notify("error", f"An error occurred while saving your RSVP: {str(e)}")
         st.session_state.submission_in_progress = False
         return False
 
+# The guest list and each guest's fields are fragments, so adding, removing or
+# editing a guest reruns only that part of the page instead of the whole form
+@st.fragment
+def guest_details_section(config):
+    """One card per guest record, with the Add Another Guest button"""
+    for i, guest in enumerate(st.session_state.guests):
+        with st.container(border=True):
+            title_col, remove_col = st.columns(COLUMN_RATIO_GUEST)
+            with title_col:
+                st.markdown(f"**Guest {i + 1}**")
+            with remove_col:
+                if i > 0:  # Don't show remove button for first guest
+                    st.button("Remove", key=_guest_key(guest['id'], "remove"),
+                              on_click=remove_guest, args=(guest['id'],))
+
+            guest_fields(guest['id'], config)
+
+    # Add guest button
+    st.button("**Add Another Guest**", icon=":material/add:", on_click=add_guest)
+
+@st.fragment
+def guest_fields(guest_id, config):
+    """Name, menu and dietary inputs of one guest, kept in the guest's record"""
+    guest = next((guest for guest in st.session_state.guests if guest['id'] == guest_id), None)
+    if guest is None:
+        return
+
+    def text_input(label, field, **kwargs):
+        st.text_input(label, value=guest[field], key=_guest_key(guest_id, field),
+                      on_change=update_guest, args=(guest_id, field), **kwargs)
+
+    def selectbox(label, field, choices):
+        options = [""] + list(choices)
+        st.selectbox(label, options, index=options.index(guest[field]) if guest[field] in options else 0,
+                     key=_guest_key(guest_id, field), on_change=update_guest, args=(guest_id, field))
+
+    # Guest names
+    name_col1, name_col2 = st.columns(2)
+    with name_col1:
+        text_input("First Name*", "first_name", placeholder="First name")
+    with name_col2:
+        text_input("Last Name*", "last_name", placeholder="Last name")
+
+    # Menu selections
+    menu_col1, menu_col2, menu_col3 = st.columns(COLUMN_RATIO_MENU)
+    with menu_col1:
+        selectbox("Starter Choice*", "starter", config.starters)
+    with menu_col2:
+        selectbox("Main Course*", "main", config.mains)
+    with menu_col3:
+        selectbox("Dessert Choice*", "dessert", config.desserts)
+
+    # Dietary requirements
+    st.text_area(
+        "Dietary Requirements/Allergies",
+        value=guest['dietary'],
+        key=_guest_key(guest_id, "dietary"),
+        on_change=update_guest,
+        args=(guest_id, "dietary"),
+        placeholder="Please list any allergies or dietary requirements",
+        height=60
+    )
+
 def rsvp_form_page():
     """Main RSVP form page"""
+    config = get_config()
+
     # Create 3-column layout with 2,5,2 ratio - left and right are spacers
     left_spacer, main_col, right_spacer = st.columns([1, 3, 1])
 
     with main_col:
         col1, col2 = st.columns(COLUMN_RATIO_HEADER)
         with col1:
-            st.header(f"{st.secrets['wedding']['wedding_couple']} Wedding RSVP")
-            st.write(st.secrets["welcome"]["message"])
+            st.header(f"{config.wedding_couple} Wedding RSVP")
+            st.write(config.welcome_message)
             st.write("Please provide below the details for each guest attending (view the full menu on the [**Event Information**](/event_info_page) page).")
             # Check deadline status and display countdown/warning
-            deadline = get_deadline_datetime()
-            if deadline:
-                if is_past_deadline():
-                    if is_within_grace_period():
-                        st.error(":material/schedule: RSVP deadline has passed, but submissions are still being accepted for a limited time.")
-                        grace_end = deadline + timedelta(hours=st.secrets["deadline"].get("grace_period_hours", 24))
-                        st.warning(f":material/timer: Grace period ends: {grace_end.strftime('%B %d, %Y at %I:%M %p %Z')}")
-                    else:
-                        st.error(":material/block: RSVP deadline has passed. New submissions are no longer accepted.")
-                        st.info("Please contact the wedding couple directly if you need to make changes to your RSVP.")
-                        return  # Stop rendering the form
-                elif is_within_warning_period():
-                    time_remaining = get_time_until_deadline()
-                    formatted_time = format_time_remaining(time_remaining)
+            window = get_deadline_window()
+            if window:
+                deadline = window.deadline
+                status = window.phase()
+                if status.phase == DeadlineWindow.GRACE:
+                    st.error(":material/schedule: RSVP deadline has passed, but submissions are still being accepted for a limited time.")
+                    st.warning(f":material/timer: Grace period ends: {window.grace_end.strftime('%B %d, %Y at %I:%M %p %Z')}")
+                elif status.phase == DeadlineWindow.CLOSED:
+                    st.error(":material/block: RSVP deadline has passed. New submissions are no longer accepted.")
+                    st.info("Please contact the wedding couple directly if you need to make changes to your RSVP.")
+                    return  # Stop rendering the form
+                elif status.phase == DeadlineWindow.WARNING:
+                    formatted_time = format_time_remaining(status.time_remaining)
 
                     st.warning(f":material/schedule: **RSVP Deadline Approaching!**")
 
@@ -238,13 +365,14 @@ def rsvp_form_page():
                         """, unsafe_allow_html=True)
                 else:
                     # Show normal deadline info
-                    time_remaining = get_time_until_deadline()
-                    formatted_time = format_time_remaining(time_remaining)
+                    formatted_time = format_time_remaining(status.time_remaining)
                     st.info(f":material/schedule: **RSVP Deadline**:  {deadline.strftime('%B %d, %Y at %I:%M %p')} ({formatted_time} remaining)")
 
         with col2:
-            if st.secrets['wedding'].get('banner_image'):
-                st.image(st.secrets['wedding']['banner_image'])
+            if config.banner_image:
+                # Above the fold, so not lazy-loaded; the header column is about a fifth of the page
+                show_image(config.banner_image, alt=config.wedding_couple,
+                           sizes="(max-width: 640px) 100vw, 20vw", lazy=False)
         st.markdown("---")
 
         # Initialize session state
@@ -252,6 +380,7 @@ def rsvp_form_page():
 
         # Check if form has been successfully submitted
         if st.session_state.form_submitted:
+            show_submission_messages()
             st.success(":material/check_circle: RSVP submitted successfully! Thank you for your response.")
             st.balloons()
 
@@ -262,16 +391,6 @@ def rsvp_form_page():
             # st.info(":material/lightbulb: If you need to submit another RSVP or make changes, please click the button above.")
             return
 
-        # Check if submission is in progress
-        if st.session_state.submission_in_progress:
-            st.info(":material/refresh: Processing your RSVP submission...")
-            with st.spinner("Please wait..."):
-                if process_submission():
-                    st.rerun()
-                else:
-                    st.rerun()
-            return
-
         # RSVP Response
         with st.container(border=True):
             st.markdown("**Will you be attending our wedding?**")
@@ -286,124 +405,37 @@ def rsvp_form_page():
             st.markdown("**Contact Information**")
             contact_col1, contact_col2, contact_col3 = st.columns(COLUMN_RATIO_CONTACT)
             with contact_col1:
-                contact_name = st.text_input("Primary Contact Name*", key="contact_name", width=300)
+                st.text_input("Primary Contact Name*", key="contact_name", width=300)
             with contact_col2:
-                contact_email = st.text_input("Email Address", key="contact_email", width=350)
+                st.text_input("Email Address", key="contact_email", width=350)
             with contact_col3:
-                contact_phone = st.text_input("Phone Number", key="contact_phone", width=200)
+                st.text_input("Phone Number", key="contact_phone", width=200)
 
         if attending == "Yes, I/we will attend":
             st.markdown("**Guest Details & Menu Choices**")
             st.write("Please provide details for each guest attending (view the full menu on the [**Event Information**](/event_info_page) page):")
 
-            # Display guests
-            for i, _ in enumerate(st.session_state.guests):
-                with st.container(border=True):
-                    st.markdown(f"**Guest {i + 1}**")
-
-                    # Create columns for guest details
-                    guest_col1, guest_col2 = st.columns(COLUMN_RATIO_GUEST)
-
-                    with guest_col1:
-                        name_col1, name_col2 = st.columns(2)
-                        with name_col1:
-                            st.text_input(
-                                f"First Name*",
-                                key=f"guest_first_name_{i}",
-                                placeholder="First name"
-                            )
-                        with name_col2:
-                            st.text_input(
-                                f"Last Name*",
-                                key=f"guest_last_name_{i}",
-                                placeholder="Last name"
-                            )
-
-                    with guest_col2:
-                        if i > 0:  # Don't show remove button for first guest
-                            if st.button(f"Remove", key=f"remove_{i}"):
-                                remove_guest(i)
-                                st.rerun()
-
-                    # Menu selections
-                    menu_col1, menu_col2, menu_col3 = st.columns(COLUMN_RATIO_MENU)
-
-                    with menu_col1:
-                        st.selectbox(
-                            "Starter Choice*",
-                            [""] + STARTERS,
-                            key=f"starter_{i}",
-                            index=0
-                        )
-
-                    with menu_col2:
-                        st.selectbox(
-                            "Main Course*",
-                            [""] + MAINS,
-                            key=f"main_{i}",
-                            index=0
-                        )
-
-                    with menu_col3:
-                        st.selectbox(
-                            "Dessert Choice*",
-                            [""] + DESSERTS,
-                            key=f"dessert_{i}",
-                            index=0
-                        )
-
-                    # Dietary requirements
-                    st.text_area(
-                        "Dietary Requirements/Allergies",
-                        key=f"dietary_{i}",
-                        placeholder="Please list any allergies or dietary requirements",
-                        height=60
-                    )
-
-
-            # Add guest button
-            if st.button("**Add Another Guest**", icon=":material/add:"):
-                add_guest()
-                st.rerun()
+            guest_details_section(config)
 
         # Additional comments
         with st.container(border=True):
             st.markdown("**Additional Comments**")
-            comments = st.text_area(
+            st.text_area(
                 "Any additional comments or special requests:",
                 key="comments",
                 height=100
             )
 
-        # Submit button
-        if st.button("Submit RSVP", type="primary", width="content"):
-            # Store form data in session state before processing
-            st.session_state.form_data = {
-                'attending': attending,
-                'contact_name': contact_name,
-                'contact_email': contact_email,
-                'contact_phone': contact_phone,
-                'comments': comments
-            }
-
-            # Store guest data
-            for i, _ in enumerate(st.session_state.guests):
-                st.session_state.form_data[f"guest_first_name_{i}"] = st.session_state.get(f"guest_first_name_{i}", "")
-                st.session_state.form_data[f"guest_last_name_{i}"] = st.session_state.get(f"guest_last_name_{i}", "")
-                st.session_state.form_data[f"starter_{i}"] = st.session_state.get(f"starter_{i}", "")
-                st.session_state.form_data[f"main_{i}"] = st.session_state.get(f"main_{i}", "")
-                st.session_state.form_data[f"dessert_{i}"] = st.session_state.get(f"dessert_{i}", "")
-                st.session_state.form_data[f"dietary_{i}"] = st.session_state.get(f"dietary_{i}", "")
-
-            # Set submission in progress
-            st.session_state.submission_in_progress = True
-            st.rerun()
+        # Submit button: submit_rsvp() runs before the next script run, which
+        # then shows the confirmation or the errors below the button
+        st.button("Submit RSVP", type="primary", width="content", on_click=submit_rsvp)
+        show_submission_messages()
 
 def main():
     """Main application entry point"""
     initialize_session_state()
 
-    if st.session_state.authenticated:
+    if is_admin():
         # Admin is logged in - show only admin pages with sidebar navigation
         _run_admin_navigation()
     else:
@@ -411,9 +443,10 @@ def main():
         _run_public_navigation()
 
 def _run_admin_navigation():
+    config = get_config()
     st.set_page_config(
-        page_title=st.secrets["wedding"]["page_title"],
-        page_icon=st.secrets["wedding"]["page_icon"],
+        page_title=config.page_title,
+        page_icon=config.page_icon,
         layout="wide",
         initial_sidebar_state="expanded"
     )
@@ -432,8 +465,7 @@ def _run_admin_navigation():
     # Add logout button to sidebar
     with st.sidebar:
         if st.button(":material/logout: Logout", type="secondary", use_container_width=True):
-            st.session_state.authenticated = False
-            st.session_state.just_logged_in = False
+            log_out_admin()
             st.success("Successfully logged out!")
             st.rerun()
 
@@ -0,0 +1,238 @@
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime, timedelta
+
+import toml
+
+# Pages to benchmark as (title, module, function, requires admin login)
+PAGES = [
+    ("rsvp_form", "app", "rsvp_form_page", False),
+    ("event_info", "event_info", "event_info_page", False),
+    ("admin_summary", "admin", "admin_summary_page", True),
+    ("admin_menu", "admin", "admin_menu_page", True),
+    ("admin_data", "admin", "admin_data_page", True),
+    ("admin_settings", "admin_settings", "admin_settings_page", True),
+]
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+
+FIRST_NAMES = ["Alice", "Ben", "Chloé", "David", "Emma", "Finn", "Grace", "Hugo", "Isla", "Jack"]
+LAST_NAMES = ["Smith", "Jones", "Taylor", "Brown", "Williams", "Wilson", "Davies", "Évans", "Thomas", "Roberts"]
+DIETARY = ["", "", "", "", "Vegetarian", "Nut allergy", "Gluten free", "Vegan"]
+
+def _page_script(module_name, function_name, authenticated, session_state):
+    """Script executed by AppTest: render one page the way st.navigation would"""
+    import importlib
+    import streamlit as st
+    from config import log_in_admin, log_out_admin
+
+    if authenticated:
+        log_in_admin()
+    else:
+        log_out_admin()
+    for key, value in session_state.items():
+        st.session_state.setdefault(key, value)
+    getattr(importlib.import_module(module_name), function_name)()
+
+def write_fixture_secrets(directory, backend):
+    """Write a secrets.toml based on the example configuration into directory"""
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    secrets = toml.load(os.path.join(repo_dir, ".streamlit", "secrets.toml.example"))
+
+    secrets["files"]["csv_file"] = os.path.join(directory, "rsvps.csv")
+    secrets["files"]["sqlite_file"] = os.path.join(directory, "rsvps.db")
+    secrets["files"]["backend"] = backend
+    # Keep the deadline open so the RSVP form renders in full
+    deadline = datetime.now() + timedelta(days=30)
+    secrets["deadline"]["deadline_datetime"] = deadline.strftime("%Y-%m-%d %H:%M")
+
+    path = os.path.join(directory, "secrets.toml")
+    with open(path, 'w') as f:
+        toml.dump(secrets, f)
+    return path, secrets
+
+def synthetic_rsvps(rows, menu, seed=0):
+    """Generate rows of RSVP data in parties of one to four guests"""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    rsvp_rows = []
+
+    while len(rsvp_rows) < rows:
+        party = len(rsvp_rows)
+        contact = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {party}"
+        timestamp = (start + timedelta(minutes=party)).strftime("%Y-%m-%d %H:%M:%S")
+        attending = "Yes" if rng.random() < 0.8 else "No"
+        common = {
+            "timestamp": timestamp,
+            "contact_name": contact,
+            "contact_email": f"guest{party}@example.com",
+            "contact_phone": f"+1 555 {party:07d}",
+            "attending": attending,
+            "comments": rng.choice(["", "", "Can't wait!", "See you there"])
+        }
+
+        guests = rng.randint(1, 4) if attending == "Yes" else 1
+        for _ in range(min(guests, rows - len(rsvp_rows))):
+            row = dict(common)
+            if attending == "Yes":
+                row.update({
+                    "guest_first_name": rng.choice(FIRST_NAMES),
+                    "guest_last_name": rng.choice(LAST_NAMES),
+                    "starter_choice": rng.choice(menu["starters"]),
+                    "main_choice": rng.choice(menu["mains"]),
+                    "dessert_choice": rng.choice(menu["desserts"]),
+                    "dietary_requirements": rng.choice(DIETARY)
+                })
+            rsvp_rows.append(row)
+
+    return rsvp_rows
+
+def count_elements(node):
+    """Count every element and block below an AppTest tree node"""
+    children = getattr(node, "children", None) or {}
+    return sum(1 + count_elements(child) for child in children.values())
+
+def payload_bytes(node):
+    """Serialized size of the element and block protos below an AppTest tree node
+
+    This is roughly the size of the deltas sent to the browser for one run.
+    """
+    proto = getattr(node, "proto", None)
+    size = proto.ByteSize() if hasattr(proto, "ByteSize") else 0
+    children = getattr(node, "children", None) or {}
+    return size + sum(payload_bytes(child) for child in children.values())
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
+
+def benchmark_page(module_name, function_name, authenticated, runs, timeout, session_state=None):
+    """Time repeated reruns of one page and measure its elements, payload and peak memory"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_function(_page_script, args=(module_name, function_name, authenticated, session_state or {}),
+                               default_timeout=timeout)
+
+    # Warm-up run: imports modules and fills process-wide caches
+    at.run()
+    if at.exception:
+        raise RuntimeError(f"{function_name} raised: {at.exception[0].value}")
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    # Peak memory is measured on a separate run since tracing slows it down
+    tracemalloc.start()
+    at.run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "p50_ms": round(percentile(timings, 50), 2),
+        "p95_ms": round(percentile(timings, 95), 2),
+        "mean_ms": round(sum(timings) / len(timings), 2),
+        "elements": count_elements(at._tree),
+        "payload_kb": round(payload_bytes(at._tree) / 1024, 1),
+        "peak_memory_kb": round(peak / 1024, 1)
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return None
+
+def print_comparison(results, baseline_path):
+    """Print the change in p50/p95 against an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = {(r["page"], r["rows"]): r for r in json.load(f)["results"]}
+
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        before = baseline.get((result["page"], result["rows"]))
+        if before is None:
+            continue
+        change = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0
+        print(f"{result['page']:<16}{result['rows']:>8}  p50 {before['p50_ms']:>9.2f} -> {result['p50_ms']:>9.2f} ms "
+              f"({change:+.1f}%)  p95 {before['p95_ms']:>9.2f} -> {result['p95_ms']:>9.2f} ms  "
+              f"elements {before['elements']} -> {result['elements']}"
+              + (f"  sent {before['payload_kb']} -> {result['payload_kb']} KB" if "payload_kb" in before else ""))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark page rerun latency with streamlit.testing AppTest")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="RSVP rows per dataset")
+    parser.add_argument("--runs", type=int, default=20, help="Timed reruns per page and dataset")
+    parser.add_argument("--pages", nargs="+", choices=[page[0] for page in PAGES], help="Pages to run (default: all)")
+    parser.add_argument("--backend", default="csv", help="Storage backend for the fixture configuration")
+    parser.add_argument("--compact", action="store_true", help="Render admin lists in the compact (table) layout")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds allowed per script run")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", help="Earlier JSON results file to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        secrets_path, secrets = write_fixture_secrets(directory, args.backend)
+        # Must be set before the app modules are imported
+        os.environ["RSVP_SECRETS_FILE"] = secrets_path
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+        from storage import open_store
+        import pandas as pd
+
+        store = open_store(secrets["files"])
+        pages = [page for page in PAGES if not args.pages or page[0] in args.pages]
+        session_state = {"compact_lists": args.compact}
+        results = []
+
+        for rows in args.sizes:
+            store.replace(pd.DataFrame(synthetic_rsvps(rows, secrets["menu"])))
+
+            for title, module_name, function_name, authenticated in pages:
+                result = benchmark_page(module_name, function_name, authenticated, args.runs, args.timeout,
+                                        session_state)
+                result = {"page": title, "rows": rows, **result}
+                results.append(result)
+                print(f"{title:<16}{rows:>8}  p50 {result['p50_ms']:>9.2f} ms  p95 {result['p95_ms']:>9.2f} ms  "
+                      f"{result['elements']:>6} elements  {result['payload_kb']:>8.1f} KB sent  "
+                      f"{result['peak_memory_kb']:>10.1f} KB peak")
+
+    import pandas as pd
+    import streamlit as st
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "backend": args.backend,
+            "compact": args.compact,
+            "runs": args.runs,
+            "python": platform.python_version(),
+            "streamlit": st.__version__,
+            "pandas": pd.__version__
+        },
+        "results": results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        print_comparison(results, args.compare)
+
+if __name__ == "__main__":
+    main()
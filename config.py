@@ -0,0 +1,372 @@
+import os
+import time
+import threading
+import re
+import itertools
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+import toml
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Path to the configuration file, overridable for tests and benchmarks
+SECRETS_PATH = os.environ.get("RSVP_SECRETS_FILE", os.path.join(".streamlit", "secrets.toml"))
+
+# Directory of hosted events, one <name>/secrets.toml each, selected with ?event=<name>
+EVENTS_DIR = os.environ.get("RSVP_EVENTS_DIR", "events")
+
+# Events kept open at once; the least recently used is closed beyond this
+MAX_ACTIVE_EVENTS = int(os.environ.get("RSVP_MAX_ACTIVE_EVENTS", "16"))
+
+# The event configured by SECRETS_PATH, used when no event is selected
+DEFAULT_EVENT = ""
+
+# Event names double as directory names, so only simple slugs are accepted
+EVENT_NAME = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+# URL query parameter selecting the event, and the session state key that keeps it
+EVENT_PARAM = "event"
+EVENT_SESSION_KEY = "event"
+
+# Session state key of the event the admin logged in to
+ADMIN_EVENT_KEY = "authenticated_event"
+
+# [files] settings holding paths, resolved against an event's own directory
+FILE_KEYS = ["csv_file", "sqlite_file", "parquet_dir"]
+
+# Minimum seconds between checks of the file on disk for changes
+RELOAD_CHECK_INTERVAL = 1.0
+
+# Keys every page relies on, as (section, key)
+REQUIRED_KEYS = [
+    ("wedding", "page_title"), ("wedding", "page_icon"), ("wedding", "wedding_couple"),
+    ("files", "csv_file"), ("admin", "password"),
+    ("menu", "starters"), ("menu", "mains"), ("menu", "desserts"),
+    ("deadline", "deadline_datetime"),
+    ("event", "welcome_text"), ("event", "wedding_date"), ("event", "ceremony_time"),
+    ("event", "venue_name"), ("event", "venue_address")
+]
+
+class ConfigError(ValueError):
+    """Raised when secrets.toml is missing required settings or has invalid values"""
+
+def _freeze(value):
+    """Recursively convert dicts to read-only mappings and lists to tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _thaw(value):
+    """Convert a frozen value back into plain dicts and lists"""
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+def validate(data):
+    """Return a list of problems with a parsed secrets.toml dictionary"""
+    problems = []
+    for section, key in REQUIRED_KEYS:
+        if not isinstance(data.get(section), dict) or key not in data[section]:
+            problems.append(f"Missing setting [{section}] {key}")
+
+    menu = data.get("menu", {})
+    for course in ("starters", "mains", "desserts"):
+        if course in menu and not isinstance(menu[course], list):
+            problems.append(f"[menu] {course} must be a list")
+
+    deadline = data.get("deadline", {})
+    if "deadline_datetime" in deadline:
+        try:
+            datetime.strptime(str(deadline["deadline_datetime"]), "%Y-%m-%d %H:%M")
+        except ValueError:
+            problems.append("[deadline] deadline_datetime must use the YYYY-MM-DD HH:MM format")
+    for key in ("grace_period_hours", "warning_days"):
+        if key in deadline and not isinstance(deadline[key], (int, float)):
+            problems.append(f"[deadline] {key} must be a number")
+
+    admin = data.get("admin", {})
+    if "recent_rsvps" in admin and (not isinstance(admin["recent_rsvps"], int) or admin["recent_rsvps"] < 1):
+        problems.append("[admin] recent_rsvps must be a whole number of at least 1")
+    if "compact_lists" in admin and not isinstance(admin["compact_lists"], bool):
+        problems.append("[admin] compact_lists must be true or false")
+
+    return problems
+
+@dataclass(frozen=True)
+class Config:
+    """Validated, read-only snapshot of secrets.toml"""
+
+    version: int
+    data: MappingProxyType
+    page_title: str
+    page_icon: str
+    wedding_couple: str
+    banner_image: str
+    welcome_message: str
+    admin_password: str
+    recent_rsvps: int
+    compact_lists: bool
+    files: MappingProxyType
+    starters: tuple
+    mains: tuple
+    desserts: tuple
+    deadline: MappingProxyType
+    timezone: str
+    event: MappingProxyType
+
+    @classmethod
+    def from_dict(cls, data, version):
+        """Validate a parsed secrets.toml dictionary and freeze it"""
+        problems = validate(data)
+        if problems:
+            raise ConfigError("; ".join(problems))
+
+        frozen = _freeze(data)
+        wedding = frozen["wedding"]
+        # The welcome message has lived in both [welcome] and [ui]
+        welcome_message = (frozen.get("welcome", {}).get("message")
+                           or frozen.get("ui", {}).get("welcome_message", ""))
+
+        return cls(
+            version=version,
+            data=frozen,
+            page_title=wedding["page_title"],
+            page_icon=wedding["page_icon"],
+            wedding_couple=wedding["wedding_couple"],
+            banner_image=wedding.get("banner_image", ""),
+            welcome_message=welcome_message,
+            admin_password=frozen["admin"]["password"],
+            recent_rsvps=frozen["admin"].get("recent_rsvps", 10),
+            compact_lists=frozen["admin"].get("compact_lists", False),
+            files=frozen["files"],
+            starters=frozen["menu"]["starters"],
+            mains=frozen["menu"]["mains"],
+            desserts=frozen["menu"]["desserts"],
+            deadline=frozen["deadline"],
+            timezone=frozen["deadline"].get("timezone", "UTC"),
+            event=frozen["event"]
+        )
+
+    def get(self, section, default=None):
+        """Look up a top-level section, like dict.get"""
+        return self.data.get(section, default)
+
+    def __getitem__(self, section):
+        return self.data[section]
+
+    def to_dict(self):
+        """A mutable copy of the configuration, e.g. for the settings editor"""
+        return _thaw(self.data)
+
+# Snapshot versions are unique across every event, so caches keyed on a
+# version never confuse two events
+_versions = itertools.count(1)
+
+def _file_stat(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+def load_config(path=SECRETS_PATH, base_dir=None):
+    """Parse and validate a secrets.toml file into a new Config snapshot
+
+    If base_dir is given, relative [files] paths are resolved against it, so
+    every event keeps its data next to its own configuration.
+    """
+    try:
+        data = toml.load(path)
+    except (OSError, toml.TomlDecodeError) as e:
+        raise ConfigError(f"Could not read {path}: {e}")
+
+    if base_dir and isinstance(data.get("files"), dict):
+        for key in FILE_KEYS:
+            value = data["files"].get(key)
+            if isinstance(value, str) and not os.path.isabs(value):
+                data["files"][key] = os.path.join(base_dir, value)
+    return Config.from_dict(data, next(_versions))
+
+class ConfigFile:
+    """The current snapshot of one secrets.toml, reloaded when the file changes on disk"""
+
+    def __init__(self, path, base_dir=None):
+        self.path = path
+        self.base_dir = base_dir
+        self._reload_lock = threading.Lock()
+        # Current snapshot, swapped atomically when the file changes
+        self._current = None
+        self._current_stat = None
+        self._last_check = 0.0
+        self._last_error = None
+
+    def reload(self):
+        """Reload the file now, keeping the previous snapshot if the file is invalid"""
+        with self._reload_lock:
+            stat = _file_stat(self.path)
+            try:
+                config = load_config(self.path, self.base_dir)
+            except ConfigError as e:
+                self._last_error = str(e)
+                if self._current is None:
+                    raise
+            else:
+                self._current = config
+                self._last_error = None
+            self._current_stat = stat
+            self._last_check = time.monotonic()
+            return self._current
+
+    def get(self):
+        """The current snapshot, checking the file for changes at most every RELOAD_CHECK_INTERVAL"""
+        config = self._current
+        if config is not None and time.monotonic() - self._last_check < RELOAD_CHECK_INTERVAL:
+            return config
+
+        if config is None or _file_stat(self.path) != self._current_stat:
+            return self.reload()
+
+        self._last_check = time.monotonic()
+        return config
+
+    @property
+    def error(self):
+        """The error from the last reload that was rejected, if any"""
+        return self._last_error
+
+class Event:
+    """One hosted event: its configuration plus the resources opened for it"""
+
+    def __init__(self, name, config_file):
+        self.name = name
+        self.config_file = config_file
+        # Stores, caches and other per-event state, filled in by utils
+        self.resources = {}
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def close(self):
+        """Release the resources of an evicted event, writing its queued submissions first
+
+        Sessions that still hold the event find it closed and open it again
+        through the registry, so its files never have two sets of resources.
+        """
+        with self.lock:
+            self.closed = True
+            resources, self.resources = self.resources, {}
+        for resource in resources.values():
+            if hasattr(resource, "close"):
+                resource.close()
+
+class EventRegistry:
+    """Events in use, keeping at most capacity of them and evicting the least recently used"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._events = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            event = self._events.get(name)
+            if event is not None:
+                self._events.move_to_end(name)
+                return event
+
+        path = event_secrets_path(name)
+        if name != DEFAULT_EVENT and not os.path.exists(path):
+            raise ConfigError(f"Unknown event: {name}")
+        # Loaded outside the registry lock, so a slow file does not hold up other events
+        config_file = ConfigFile(path, os.path.dirname(path) if name != DEFAULT_EVENT else None)
+        config_file.reload()
+
+        evicted = []
+        with self._lock:
+            # Another session may have opened the event in the meantime
+            event = self._events.setdefault(name, Event(name, config_file))
+            self._events.move_to_end(name)
+            while len(self._events) > self.capacity:
+                evicted.append(self._events.popitem(last=False)[1])
+
+        # Closed outside the registry lock, as draining a write queue can take a while
+        for old_event in evicted:
+            old_event.close()
+        return event
+
+_registry = EventRegistry(MAX_ACTIVE_EVENTS)
+
+def event_secrets_path(name):
+    """Path of an event's secrets.toml; the default event uses SECRETS_PATH"""
+    if name == DEFAULT_EVENT:
+        return SECRETS_PATH
+    if not EVENT_NAME.match(name):
+        raise ConfigError(f"Invalid event name: {name!r}")
+    return os.path.join(EVENTS_DIR, name, "secrets.toml")
+
+def select_event(name):
+    """Make name the event of the current Streamlit session, e.g. from ?event=<name>
+
+    Switching to another event starts the session afresh: the RSVP form and
+    its idempotency token, the admin login (every event has its own admin
+    password) and the admin page settings all belong to the previous event.
+    """
+    name = name or DEFAULT_EVENT
+    _registry.get(name)  # Raises ConfigError for an unknown event
+    if name != st.session_state.get(EVENT_SESSION_KEY, DEFAULT_EVENT):
+        st.session_state.clear()
+        log_out_admin()
+    st.session_state[EVENT_SESSION_KEY] = name
+
+def log_in_admin():
+    """Log the session in to the admin pages of its current event"""
+    st.session_state.authenticated = True
+    st.session_state[ADMIN_EVENT_KEY] = current_event()
+
+def log_out_admin():
+    """Log the session out of the admin pages"""
+    st.session_state.authenticated = False
+    st.session_state.just_logged_in = False
+    st.session_state.pop(ADMIN_EVENT_KEY, None)
+    # The next login counts new RSVPs from the recorded last visit again
+    st.session_state.pop("recent_cursor", None)
+
+def is_admin():
+    """Whether the session is logged in to the admin pages of its current event"""
+    return (bool(st.session_state.get("authenticated"))
+            and st.session_state.get(ADMIN_EVENT_KEY) == current_event())
+
+def current_event():
+    """Name of the current session's event, or DEFAULT_EVENT outside a Streamlit script run
+
+    Deferred work that runs outside the script (such as download callables)
+    must be given the event name explicitly.
+    """
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return DEFAULT_EVENT
+    return st.session_state.get(EVENT_SESSION_KEY, DEFAULT_EVENT)
+
+def get_event(name=None):
+    """An event by name (the current session's event by default)"""
+    return _registry.get(current_event() if name is None else name)
+
+def get_config_file(name=None):
+    """The ConfigFile of an event (the current session's event by default)"""
+    return get_event(name).config_file
+
+def reload_config(name=None):
+    """Reload an event's secrets.toml now, keeping the previous snapshot if the file is invalid"""
+    return get_config_file(name).reload()
+
+def get_config(name=None):
+    """The current configuration snapshot of an event, reloaded when its secrets.toml changes on disk"""
+    return get_config_file(name).get()
+
+def get_config_error(name=None):
+    """The error from the last reload of an event's secrets.toml that was rejected, if any"""
+    return get_config_file(name).error
@@ -1,10 +1,211 @@
 import streamlit as st
 
+from config import get_event
+from images import show_image
+
+COURSE_HEADINGS = [
+    ("starters_detailed", ":material/restaurant: Starters"),
+    ("mains_detailed", ":material/hand_meal: Main Courses"),
+    ("desserts_detailed", ":material/cake: Desserts")
+]
+
+REGISTRY_CARD_HTML = """
+<div style='
+    text-align: center;
+    padding: 20px;
+    border: 1px solid #ddd;
+    border-radius: 10px;
+    background-color: #f9f9f9;
+'>
+    <h3>{name}</h3>
+    <a href='{url}' target='_blank' style='
+        text-decoration: none;
+        background-color: #4CAF50;
+        color: white;
+        padding: 10px 20px;
+        border-radius: 5px;
+        display: inline-block;
+        margin-top: 10px;
+    '>View Registry</a>
+</div>
+"""
+
+def _render_blocks(blocks):
+    """Emit prebuilt (element, text) pairs, e.g. ("write", "...") -> st.write("...")"""
+    for element, text in blocks:
+        getattr(st, element)(text)
+
+def _menu_item_blocks(items):
+    """Blocks for the valid items of one detailed menu course"""
+    blocks = []
+    for item in items:
+        if hasattr(item, 'get'):
+            if item.get('name', '').strip():
+                blocks.append(("markdown", f"**{item['name']}**"))
+                if item.get('description'):
+                    blocks.append(("caption", item['description']))
+                blocks.append(("write", ""))
+        elif isinstance(item, str) and item.strip():
+            blocks.append(("write", f"• {item}"))
+    return blocks
+
+def _venue(event, prefix, spacer=False):
+    """Venue details for the ceremony_venue_* or venue_* settings"""
+    return {
+        "spacer": spacer,
+        "name": f"**{event[prefix + 'name']}**",
+        "address": event.get(prefix + 'address', ''),
+        "description": event.get(prefix + 'description'),
+        "map_url": event.get(prefix + 'map_url'),
+        "image": event.get(prefix + 'image'),
+        "image_alt": event[prefix + 'name']
+    }
+
+def _hotel_blocks(hotel):
+    blocks = [("write", f"**Address:** {hotel['address']}")]
+    if hotel.get('distance'):
+        blocks.append(("write", f"**Distance from venue:** {hotel['distance']}"))
+    if hotel.get('phone'):
+        blocks.append(("write", f"**Phone:** {hotel['phone']}"))
+    if hotel.get('booking_code'):
+        blocks.append(("info", f":material/info: Use booking code: **{hotel['booking_code']}** for our group rate"))
+    if hotel.get('website'):
+        blocks.append(("markdown", f"[:material/link: Visit Website]({hotel['website']})"))
+    if hotel.get('notes'):
+        blocks.append(("write", hotel['notes']))
+    return blocks
+
+def _contact_blocks(person):
+    blocks = [("write", f"**{person['name']}**")]
+    if person.get('phone'):
+        blocks.append(("write", f":material/phone: {person['phone']}"))
+    if person.get('email'):
+        blocks.append(("write", f":material/email: {person['email']}"))
+    return blocks
+
+def build_page_model(config):
+    """Precompute everything event_info_page shows from a config snapshot"""
+    event = config['event']
+
+    model = {
+        "title": f":material/celebration: The Wedding of {config.wedding_couple}",
+        "welcome_text": event['welcome_text'],
+        "wedding_date": event['wedding_date'],
+        "ceremony_time": event['ceremony_time'],
+        "ceremony": _venue(event, 'ceremony_venue_', spacer=True) if event.get('ceremony_venue_name') else None,
+        "venue": _venue(event, 'venue_')
+    }
+
+    # Menu: None when there is no [menu] section, empty courses when nothing is valid
+    menu_info = config.get('menu')
+    if menu_info:
+        courses = []
+        for index, (key, heading) in enumerate(COURSE_HEADINGS):
+            blocks = _menu_item_blocks(menu_info.get(key, []))
+            if blocks:
+                courses.append((index, heading, blocks))
+        model["menu"] = {
+            "courses": courses,
+            "description": menu_info.get('menu_description'),
+            "notes": f":material/info: {menu_info['menu_notes']}" if menu_info.get('menu_notes') else None
+        }
+    else:
+        model["menu"] = None
+
+    model["timeline"] = [
+        {"time": f"**{item['time']}**", "event": item['event'], "description": item.get('description')}
+        for item in config.get('timeline', [])
+    ]
+
+    model["accommodations_intro"] = event.get('accommodations_intro',
+                                              'We have reserved room blocks at the following hotels:')
+    model["hotels"] = [
+        (f":material/hotel: {hotel['name']}", _hotel_blocks(hotel))
+        for hotel in config.get('accommodations', [])
+    ]
+
+    transport_info = event.get('transportation')
+    if transport_info:
+        sections = []
+        for key, heading, spacer in [("parking", ":material/local_parking: Parking", True),
+                                     ("public_transport", ":material/train: Public Transportation", True),
+                                     ("taxi_info", ":material/local_taxi: Taxi Services", False)]:
+            if transport_info.get(key):
+                sections.append((heading, transport_info[key], spacer))
+        model["transportation"] = sections
+    else:
+        model["transportation"] = None
+
+    model["dress_code"] = event.get('dress_code')
+    model["dress_code_notes"] = event.get('dress_code_notes')
+
+    # Filter out registries with empty name or URL
+    model["registries"] = [
+        REGISTRY_CARD_HTML.format(name=r['name'], url=r['url'])
+        for r in event.get('registry', [])
+        if r.get('name', '').strip() and r.get('url', '').strip()
+    ]
+    model["registry_message"] = event.get('registry_message',
+                                          'Your presence is the greatest gift, but if you wish to give something, we are registered at:')
+
+    # Filter out items with empty title or content
+    model["additional_info"] = [
+        (item['title'], item['content'])
+        for item in event.get('additional_info', [])
+        if item.get('title', '').strip() and item.get('content', '').strip()
+    ]
+
+    contact = config.get('contact')
+    if contact:
+        model["contact"] = [
+            (column, _contact_blocks(contact[person]))
+            for column, person in enumerate(['bride', 'groom'])
+            if contact.get(person)
+        ]
+    else:
+        model["contact"] = None
+
+    return model
+
+def get_page_model():
+    """The page model for the current event's configuration, built once per config version"""
+    event = get_event()
+    config = event.config_file.get()
+    # Page model for the config version it was built from, shared by every session of the event
+    version, model = event.resources.get("page_model", (None, None))
+    if version != config.version:
+        model = build_page_model(config)
+        event.resources["page_model"] = (config.version, model)
+    return model
+
+def _render_venue(venue):
+    venue_col1, venue_col2 = st.columns([2, 1])
+
+    with venue_col1:
+        st.write(venue['name'])
+        st.write(venue['address'])
+
+        if venue['description']:
+            if venue['spacer']:
+                st.write("")
+            st.write(venue['description'])
+
+        # Add map if URL provided
+        if venue['map_url']:
+            st.page_link(venue['map_url'], label='Open in Maps', icon=":material/map:")
+
+    with venue_col2:
+        # Venue image if provided
+        if venue['image']:
+            show_image(venue['image'], alt=venue['image_alt'], width=425, sizes="425px")
+
 def event_info_page():
+    model = get_page_model()
+
     left_spacer, main_col, right_spacer = st.columns([2, 5, 2])
     with main_col:
-        st.title(f":material/celebration: The Wedding of {st.secrets['wedding']['wedding_couple']}")
-        st.write(st.secrets['event']['welcome_text'])
+        st.title(model['title'])
+        st.write(model['welcome_text'])
 
         st.markdown("---")
 
@@ -28,204 +229,82 @@ def event_info_page():
 
                 with col1:
                     st.write("**Wedding Date**")
-                    st.write(st.secrets['event']['wedding_date'])
+                    st.write(model['wedding_date'])
 
                 with col2:
                     st.write("**Ceremony Time**")
-                    st.write(st.secrets['event']['ceremony_time'])
+                    st.write(model['ceremony_time'])
 
                 st.markdown("---")
 
                 # Ceremony Venue (Church)
-                if st.secrets['event'].get('ceremony_venue_name'):
+                if model['ceremony']:
                     st.header(":material/church: Wedding Ceremony")
-
-                    ceremony_col1, ceremony_col2 = st.columns([2, 1])
-
-                    with ceremony_col1:
-                        st.write(f"**{st.secrets['event']['ceremony_venue_name']}**")
-                        st.write(st.secrets['event']['ceremony_venue_address'])
-
-                        if st.secrets['event'].get('ceremony_venue_description'):
-                            st.write("")
-                            st.write(st.secrets['event']['ceremony_venue_description'])
-
-                        # Add map if URL provided
-                        if st.secrets['event'].get('ceremony_venue_map_url'):
-                            st.page_link(st.secrets['event']['ceremony_venue_map_url'], label='Open in Maps', icon=":material/map:")
-
-                    with ceremony_col2:
-                        # Ceremony venue image if provided
-                        if st.secrets['event'].get('ceremony_venue_image'):
-                            st.image(st.secrets['event']['ceremony_venue_image'], width=425)
-
+                    _render_venue(model['ceremony'])
                     st.markdown("---")
 
                 # Reception Venue
                 st.header(":material/celebration: Reception Venue")
-
-                venue_col1, venue_col2 = st.columns([2, 1])
-
-                with venue_col1:
-                    st.write(f"**{st.secrets['event']['venue_name']}**")
-                    st.write(st.secrets['event']['venue_address'])
-
-                    if st.secrets['event'].get('venue_description'):
-                        st.write(st.secrets['event']['venue_description'])
-
-                    # Add map if URL provided
-                    if st.secrets['event'].get('venue_map_url'):
-                        st.page_link(st.secrets['event']['venue_map_url'], label='Open in Maps', icon=":material/map:")
-
-                with venue_col2:
-                    # Venue image if provided
-                    if st.secrets['event'].get('venue_image'):
-                        st.image(st.secrets['event']['venue_image'], width=425)
+                _render_venue(model['venue'])
 
         # Tab 2: Menu
         with tab2:
-            if st.secrets.get('menu'):
+            menu = model['menu']
+            if menu is not None:
                 with st.container(border=True):
-                    menu_info = st.secrets['menu']
-
-                    # Check if there are any detailed menu items to display
-                    starters_detailed = menu_info.get('starters_detailed', [])
-                    mains_detailed = menu_info.get('mains_detailed', [])
-                    desserts_detailed = menu_info.get('desserts_detailed', [])
-
-                    # Helper function to check if items exist and are valid
-                    def has_valid_items(items):
-                        if not items:
-                            return False
-                        for item in items:
-                            if isinstance(item, dict):
-                                if item.get('name', '').strip():
-                                    return True
-                            elif isinstance(item, str) and item.strip():
-                                return True
-                        return False
-
-                    has_starters = has_valid_items(starters_detailed)
-                    has_mains = has_valid_items(mains_detailed)
-                    has_desserts = has_valid_items(desserts_detailed)
-
-                    if has_starters or has_mains or has_desserts:
+                    if menu['courses']:
                         # Optional menu description
-                        if menu_info.get('menu_description'):
-                            st.write(menu_info['menu_description'])
-
-                        menu_col1, menu_col2, menu_col3 = st.columns(3)
-
-                        if has_starters:
-                            with menu_col1:
-                                st.subheader(":material/restaurant: Starters")
-                                for item in starters_detailed:
-                                    if isinstance(item, dict):
-                                        if item.get('name', '').strip():
-                                            st.markdown(f"**{item['name']}**")
-                                            if item.get('description'):
-                                                st.caption(item['description'])
-                                            st.write("")
-                                    elif isinstance(item, str) and item.strip():
-                                        st.write(f"• {item}")
-
-                        if has_mains:
-                            with menu_col2:
-                                st.subheader(":material/hand_meal: Main Courses")
-                                for item in mains_detailed:
-                                    if isinstance(item, dict):
-                                        if item.get('name', '').strip():
-                                            st.markdown(f"**{item['name']}**")
-                                            if item.get('description'):
-                                                st.caption(item['description'])
-                                            st.write("")
-                                    elif isinstance(item, str) and item.strip():
-                                        st.write(f"• {item}")
-
-                        if has_desserts:
-                            with menu_col3:
-                                st.subheader(":material/cake: Desserts")
-                                for item in desserts_detailed:
-                                    if isinstance(item, dict):
-                                        if item.get('name', '').strip():
-                                            st.markdown(f"**{item['name']}**")
-                                            if item.get('description'):
-                                                st.caption(item['description'])
-                                            st.write("")
-                                    elif isinstance(item, str) and item.strip():
-                                        st.write(f"• {item}")
+                        if menu['description']:
+                            st.write(menu['description'])
+
+                        menu_cols = st.columns(3)
+                        for index, heading, blocks in menu['courses']:
+                            with menu_cols[index]:
+                                st.subheader(heading)
+                                _render_blocks(blocks)
 
                         # Optional menu notes
-                        if menu_info.get('menu_notes'):
-                            st.info(f":material/info: {menu_info['menu_notes']}")
+                        if menu['notes']:
+                            st.info(menu['notes'])
             else:
                 st.info("Menu information will be available soon.")
 
         # Tab 3: Timeline
         with tab3:
-            timeline_items = st.secrets.get('timeline', [])
-            if timeline_items:
+            if model['timeline']:
                 with st.container(border=True):
-                    for item in timeline_items:
+                    for item in model['timeline']:
                         with st.container():
                             time_col, event_col = st.columns([0.5, 3])
                             with time_col:
-                                st.markdown(f"**{item['time']}**")
+                                st.markdown(item['time'])
                             with event_col:
                                 st.write(item['event'])
-                                if item.get('description'):
+                                if item['description']:
                                     st.caption(item['description'])
             else:
                 st.info("Timeline information will be available soon.")
 
         # Tab 4: Accommodations
         with tab4:
-            accommodations_items = st.secrets.get('accommodations', [])
-            if accommodations_items:
-                st.write(st.secrets['event'].get('accommodations_intro',
-                        'We have reserved room blocks at the following hotels:'))
-
-                accommodations = st.secrets['accommodations']
-
-                for hotel in accommodations:
-                    with st.expander(f":material/hotel: {hotel['name']}", expanded=True):
-                        st.write(f"**Address:** {hotel['address']}")
-
-                        if hotel.get('distance'):
-                            st.write(f"**Distance from venue:** {hotel['distance']}")
-
-                        if hotel.get('phone'):
-                            st.write(f"**Phone:** {hotel['phone']}")
+            if model['hotels']:
+                st.write(model['accommodations_intro'])
 
-                        if hotel.get('booking_code'):
-                            st.info(f":material/info: Use booking code: **{hotel['booking_code']}** for our group rate")
-
-                        if hotel.get('website'):
-                            st.markdown(f"[:material/link: Visit Website]({hotel['website']})")
-
-                        if hotel.get('notes'):
-                            st.write(hotel['notes'])
+                for label, blocks in model['hotels']:
+                    with st.expander(label, expanded=True):
+                        _render_blocks(blocks)
             else:
                 st.info("Accommodation information will be available soon.")
 
         # Tab 5: Transportation
         with tab5:
-            if st.secrets['event'].get('transportation'):
-                transport_info = st.secrets['event']['transportation']
+            if model['transportation'] is not None:
                 with st.container(border=True):
-                    if transport_info.get('parking'):
-                        st.subheader(":material/local_parking: Parking")
-                        st.write(transport_info['parking'])
-                        st.markdown("")
-
-                    if transport_info.get('public_transport'):
-                        st.subheader(":material/train: Public Transportation")
-                        st.write(transport_info['public_transport'])
-                        st.markdown("")
-
-                    if transport_info.get('taxi_info'):
-                        st.subheader(":material/local_taxi: Taxi Services")
-                        st.write(transport_info['taxi_info'])
+                    for heading, text, spacer in model['transportation']:
+                        st.subheader(heading)
+                        st.write(text)
+                        if spacer:
+                            st.markdown("")
             else:
                 st.info("Transportation information will be available soon.")
 
@@ -233,96 +312,44 @@ def event_info_page():
         with tab6:
             with st.container(border=True):
             # Dress Code
-                dress_code = st.secrets['event'].get('dress_code')
-                if dress_code:
+                if model['dress_code']:
                     st.subheader(":material/checkroom: Dress Code")
-                    st.write(dress_code)
+                    st.write(model['dress_code'])
 
-                    dress_code_notes = st.secrets['event'].get('dress_code_notes')
-                    if dress_code_notes:
-                        st.info(dress_code_notes)
+                    if model['dress_code_notes']:
+                        st.info(model['dress_code_notes'])
 
                     st.markdown("---")
 
                 # Gift Registry
-                registries = st.secrets['event'].get('registry')
-                if registries:
-                    # Filter out registries with empty name or URL
-                    valid_registries = [
-                        r for r in registries
-                        if r.get('name', '').strip() and r.get('url', '').strip()
-                    ]
-
-                    if valid_registries:
-                        st.subheader(":material/card_giftcard: Gift Registry")
-                        st.write(st.secrets['event'].get('registry_message',
-                                'Your presence is the greatest gift, but if you wish to give something, we are registered at:'))
-
-                        reg_cols = st.columns(len(valid_registries))
-                        for idx, registry in enumerate(valid_registries):
-                            with reg_cols[idx]:
-                                st.markdown(f"""
-                                <div style='
-                                    text-align: center;
-                                    padding: 20px;
-                                    border: 1px solid #ddd;
-                                    border-radius: 10px;
-                                    background-color: #f9f9f9;
-                                '>
-                                    <h3>{registry['name']}</h3>
-                                    <a href='{registry['url']}' target='_blank' style='
-                                        text-decoration: none;
-                                        background-color: #4CAF50;
-                                        color: white;
-                                        padding: 10px 20px;
-                                        border-radius: 5px;
-                                        display: inline-block;
-                                        margin-top: 10px;
-                                    '>View Registry</a>
-                                </div>
-                                """, unsafe_allow_html=True)
-
-                        st.markdown("---")
+                if model['registries']:
+                    st.subheader(":material/card_giftcard: Gift Registry")
+                    st.write(model['registry_message'])
 
-                # Additional Information
-                additional_info = st.secrets['event'].get('additional_info')
-                if additional_info:
-                    # Filter out items with empty title or content
-                    valid_info = [
-                        item for item in additional_info
-                        if item.get('title', '').strip() and item.get('content', '').strip()
-                    ]
+                    reg_cols = st.columns(len(model['registries']))
+                    for idx, card_html in enumerate(model['registries']):
+                        with reg_cols[idx]:
+                            st.markdown(card_html, unsafe_allow_html=True)
 
-                    if valid_info:
-                        st.subheader(":material/info: Additional Information")
+                    st.markdown("---")
+
+                # Additional Information
+                if model['additional_info']:
+                    st.subheader(":material/info: Additional Information")
 
-                        for info_item in valid_info:
-                            with st.expander(info_item['title']):
-                                st.write(info_item['content'])
+                    for title, content in model['additional_info']:
+                        with st.expander(title):
+                            st.write(content)
 
         # Tab 7: Contact
         with tab7:
-            if st.secrets.get('contact'):
-                contact = st.secrets['contact']
+            if model['contact'] is not None:
                 with st.container(border=True):
                     st.write("If you have any questions, please don't hesitate to reach out:")
 
-                    contact_col1, contact_col2 = st.columns(2)
-
-                    if contact.get('bride'):
-                        with contact_col1:
-                            st.write(f"**{contact['bride']['name']}**")
-                            if contact['bride'].get('phone'):
-                                st.write(f":material/phone: {contact['bride']['phone']}")
-                            if contact['bride'].get('email'):
-                                st.write(f":material/email: {contact['bride']['email']}")
-
-                    if contact.get('groom'):
-                        with contact_col2:
-                            st.write(f"**{contact['groom']['name']}**")
-                            if contact['groom'].get('phone'):
-                                st.write(f":material/phone: {contact['groom']['phone']}")
-                            if contact['groom'].get('email'):
-                                st.write(f":material/email: {contact['groom']['email']}")
+                    contact_cols = st.columns(2)
+                    for column, blocks in model['contact']:
+                        with contact_cols[column]:
+                            _render_blocks(blocks)
             else:
-                st.info("Contact information will be available soon.")
\ No newline at end of file
+                st.info("Contact information will be available soon.")
@@ -0,0 +1,143 @@
+import os
+import gzip
+import hashlib
+import tempfile
+import threading
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # XLSX exports are offered only when openpyxl is installed
+    Workbook = None
+
+# Rows converted per chunk, so memory stays flat however large the export is
+CHUNK_ROWS = 5000
+
+# Export formats as key -> (label, file extension, MIME type)
+EXPORT_FORMATS = {
+    "csv": ("CSV", "csv", "text/csv"),
+    "csv.gz": ("CSV (gzip)", "csv.gz", "application/gzip"),
+    "parquet": ("Parquet", "parquet", "application/vnd.apache.parquet"),
+    "xlsx": ("Excel (XLSX)", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+# Row subsets that can be exported
+EXPORT_SUBSETS = ["all", "attending"]
+
+def available_formats():
+    """Export formats whose libraries are installed"""
+    return [key for key in EXPORT_FORMATS if key != "xlsx" or Workbook is not None]
+
+def _chunks(df, subset):
+    """Yield the rows of a subset in chunks of CHUNK_ROWS"""
+    for start in range(0, len(df), CHUNK_ROWS):
+        chunk = df.iloc[start:start + CHUNK_ROWS]
+        if subset == "attending":
+            chunk = chunk[chunk['attending'] == 'Yes']
+        yield chunk
+
+def _write_csv(df, subset, f):
+    header = True
+    for chunk in _chunks(df, subset):
+        chunk.to_csv(f, index=False, header=header)
+        header = False
+    if header:
+        # No rows matched: still write the column names
+        df.iloc[:0].to_csv(f, index=False)
+
+def write_csv(df, subset, path):
+    with open(path, 'w', newline='') as f:
+        _write_csv(df, subset, f)
+
+def write_csv_gz(df, subset, path):
+    with gzip.open(path, 'wt', newline='', compresslevel=6) as f:
+        _write_csv(df, subset, f)
+
+def write_parquet(df, subset, path):
+    # Every column is exported as text, so chunks agree on one schema
+    schema = pa.schema([(str(column), pa.string()) for column in df.columns])
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for chunk in _chunks(df, subset):
+            writer.write_table(pa.Table.from_pandas(chunk.astype("string"), schema=schema, preserve_index=False))
+
+def write_xlsx(df, subset, path):
+    # Write-only mode streams rows to disk instead of building the sheet in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("RSVPs")
+    sheet.append([str(column) for column in df.columns])
+    for chunk in _chunks(df, subset):
+        for row in chunk.astype(object).where(chunk.notna(), None).itertuples(index=False):
+            sheet.append(list(row))
+    workbook.save(path)
+
+WRITERS = {
+    "csv": write_csv,
+    "csv.gz": write_csv_gz,
+    "parquet": write_parquet,
+    "xlsx": write_xlsx,
+}
+
+class ExportCache:
+    """Export files generated on request and kept on disk until the data changes"""
+
+    def __init__(self, store):
+        self.store = store
+        self.directory = store.path + ".exports"
+        self._lock = threading.Lock()
+        # (subset, format) -> lock, so concurrent requests generate a file only once
+        self._locks = {}
+
+    def _key_lock(self, subset, export_format):
+        with self._lock:
+            return self._locks.setdefault((subset, export_format), threading.Lock())
+
+    def path(self, subset, export_format, version):
+        digest = hashlib.sha1(repr(version).encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"{subset}-{digest}.{EXPORT_FORMATS[export_format][1]}")
+
+    def get(self, subset, export_format):
+        """An open binary file of an export of the current data, generated once per data version
+
+        Files are named after the content version, so every server process
+        sharing the store also shares its exports.
+        """
+        if subset not in EXPORT_SUBSETS or export_format not in available_formats():
+            raise ValueError(f"Unknown export: {subset} {export_format}")
+
+        with self._key_lock(subset, export_format):
+            path = self.path(subset, export_format, self.store.content_version())
+            if not os.path.exists(path):
+                self._generate(subset, export_format, path)
+            # Opened before the lock is released, so a newer export removing
+            # this one cannot make it disappear
+            return open(path, 'rb')
+
+    def _generate(self, subset, export_format, path):
+        os.makedirs(self.directory, exist_ok=True)
+        df = self.store.load()
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".export_", suffix=".tmp")
+        os.close(fd)
+        try:
+            WRITERS[export_format](df, subset, tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # Remove exports of older versions of the data. Another process may
+        # have written an export of newer data meanwhile, so only files
+        # written before this one are removed
+        suffix = "." + EXPORT_FORMATS[export_format][1]
+        written = os.stat(path).st_mtime_ns
+        for name in os.listdir(self.directory):
+            if name.startswith(subset + "-") and name.endswith(suffix) and name != os.path.basename(path):
+                try:
+                    other = os.path.join(self.directory, name)
+                    if os.stat(other).st_mtime_ns <= written:
+                        os.remove(other)
+                except OSError:
+                    pass
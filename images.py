@@ -0,0 +1,246 @@
+import glob
+import hashlib
+import html
+import io
+import json
+import os
+import re
+import sys
+import urllib.parse
+import urllib.request
+
+import streamlit as st
+from PIL import Image, UnidentifiedImageError, features
+
+# Resized variants are written here and served by Streamlit's static file
+# serving (enableStaticServing in .streamlit/config.toml) at STATIC_URL
+VARIANT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "img")
+STATIC_URL = "app/static/img"
+MANIFEST_PATH = os.path.join(VARIANT_DIR, "manifest.json")
+
+# Widths of the variants: images are shown at most ~480px wide, so these
+# cover normal and high density screens. Images are never enlarged
+VARIANT_WIDTHS = (480, 960)
+
+# Smallest first: the browser picks the first <source> type it supports
+FORMATS = {
+    "avif": {"quality": 60},
+    "webp": {"quality": 80, "method": 6},
+}
+
+# Images always offered by the build step, besides the configured ones
+IMAGES_DIR = "images"
+
+# Secrets settings naming an image: (section, key)
+IMAGE_SETTINGS = [
+    ("wedding", "banner_image"),
+    ("event", "ceremony_venue_image"),
+    ("event", "venue_image"),
+]
+
+# Remote images larger than this are not downloaded
+MAX_REMOTE_BYTES = 20 * 1024 * 1024
+REMOTE_TIMEOUT = 10
+
+# (manifest file stat, manifest) last read by image_variants()
+_manifest = (None, {})
+
+def is_remote(source):
+    return source.startswith(("http://", "https://"))
+
+def source_key(source):
+    """Manifest key of a configured image: the URL, or the normalized local path"""
+    return source if is_remote(source) else os.path.normpath(source)
+
+def supported_formats():
+    """Formats of FORMATS that this Pillow build can write"""
+    return [fmt for fmt in FORMATS if features.check(fmt)]
+
+def _file_stat(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+def read_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def image_variants(source):
+    """The manifest entry of a configured image, or None if the build step has not processed it"""
+    global _manifest
+    stat = _file_stat(MANIFEST_PATH)
+    cached_stat, manifest = _manifest
+    if stat != cached_stat:
+        manifest = read_manifest()
+        _manifest = (stat, manifest)
+    return manifest.get(source_key(source)) if source else None
+
+def picture_html(entry, alt="", width=None, sizes="100vw", lazy=True):
+    """A <picture> choosing the best format and size of an image's variants"""
+    sources = []
+    fallback = None
+    for fmt, variants in entry["formats"].items():
+        srcset = ", ".join(f"{STATIC_URL}/{variant['file']} {variant['width']}w" for variant in variants)
+        sources.append(f'<source type="image/{fmt}" srcset="{srcset}" sizes="{sizes}">')
+        fallback = variants[-1]
+
+    style = f"width:{width}px;max-width:100%;height:auto" if width else "width:100%;height:auto"
+    loading = ' loading="lazy"' if lazy else ""
+    # width and height give the browser the aspect ratio before the image loads
+    img = (f'<img src="{STATIC_URL}/{fallback["file"]}" alt="{html.escape(alt)}" '
+           f'width="{fallback["width"]}" height="{fallback["height"]}" style="{style}" '
+           f'decoding="async"{loading}>')
+    return f"<picture>{''.join(sources)}{img}</picture>"
+
+def show_image(source, alt="", width=None, sizes="100vw", lazy=True):
+    """Show a configured image from its pre-sized variants, or with st.image if there are none"""
+    entry = image_variants(source)
+    if entry is None or not entry["formats"]:
+        if width:
+            st.image(source, width=width)
+        else:
+            st.image(source)
+        return
+    st.markdown(picture_html(entry, alt, width, sizes, lazy), unsafe_allow_html=True)
+
+# Build step
+
+def configured_images(secrets_paths):
+    """Every image named in the given secrets.toml files"""
+    import toml
+
+    sources = []
+    for path in secrets_paths:
+        try:
+            data = toml.load(path)
+        except (OSError, toml.TomlDecodeError) as e:
+            print(f"Skipping {path}: {e}", file=sys.stderr)
+            continue
+        for section, key in IMAGE_SETTINGS:
+            value = data.get(section, {}).get(key)
+            if isinstance(value, str) and value.strip():
+                sources.append(value.strip())
+    return sources
+
+def _read_source(source):
+    """Bytes of a local or remote image"""
+    if not is_remote(source):
+        with open(source, "rb") as f:
+            return f.read()
+
+    with urllib.request.urlopen(source, timeout=REMOTE_TIMEOUT) as response:
+        data = response.read(MAX_REMOTE_BYTES + 1)
+    if len(data) > MAX_REMOTE_BYTES:
+        raise OSError(f"larger than {MAX_REMOTE_BYTES // (1024 * 1024)} MB")
+    return data
+
+def _stem(source):
+    """File name stem of the variants of an image, e.g. "white-hart" """
+    path = urllib.parse.urlparse(source).path if is_remote(source) else source
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return re.sub(r"[^A-Za-z0-9_-]+", "-", stem).strip("-") or "image"
+
+def _write_variant(output_dir, stem, fmt, data):
+    """Write encoded image data under a name containing its content hash; returns the file name"""
+    name = f"{stem}-{hashlib.sha256(data).hexdigest()[:12]}.{fmt}"
+    path = os.path.join(output_dir, name)
+    if not os.path.exists(path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return name
+
+def make_variants(source, data, output_dir=VARIANT_DIR, widths=VARIANT_WIDTHS, formats=None):
+    """Resize and encode one image; returns its manifest entry"""
+    formats = supported_formats() if formats is None else formats
+    with Image.open(io.BytesIO(data)) as image:
+        image.load()
+        mode = "RGBA" if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info else "RGB"
+        image = image.convert(mode)
+
+    stem = _stem(source)
+    entry = {
+        "digest": hashlib.sha256(data).hexdigest(),
+        "width": image.width,
+        "height": image.height,
+        "formats": {fmt: [] for fmt in formats}
+    }
+    for width in sorted({min(width, image.width) for width in widths}):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for fmt in formats:
+            buffer = io.BytesIO()
+            resized.save(buffer, fmt.upper(), **FORMATS[fmt])
+            name = _write_variant(output_dir, stem, fmt, buffer.getvalue())
+            entry["formats"][fmt].append({"file": name, "width": width, "height": height})
+    return entry
+
+def _entry_current(entry, digest, formats, output_dir):
+    return (entry is not None and entry["digest"] == digest and list(entry["formats"]) == formats
+            and all(os.path.exists(os.path.join(output_dir, variant["file"]))
+                    for variants in entry["formats"].values() for variant in variants))
+
+def build_variants(sources, output_dir=VARIANT_DIR):
+    """Create the variants of every source that changed since the last build
+
+    Writes the manifest read by show_image() and removes variants no longer
+    referenced by it. An image that cannot be read keeps the variants of
+    its last successful build. Returns the number of images processed.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, "manifest.json")
+    old_manifest = read_manifest(manifest_path)
+    formats = supported_formats()
+
+    manifest = {}
+    built = 0
+    for source in dict.fromkeys(sources):
+        key = source_key(source)
+        try:
+            data = _read_source(source)
+            digest = hashlib.sha256(data).hexdigest()
+            if _entry_current(old_manifest.get(key), digest, formats, output_dir):
+                manifest[key] = old_manifest[key]
+                continue
+            manifest[key] = make_variants(source, data, output_dir, formats=formats)
+            built += 1
+        except (OSError, ValueError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+            print(f"Could not process {source}: {e}", file=sys.stderr)
+            if key in old_manifest:
+                manifest[key] = old_manifest[key]
+
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+    # Drop variants of images that changed or are no longer configured
+    referenced = {variant["file"] for entry in manifest.values()
+                  for variants in entry["formats"].values() for variant in variants}
+    for path in glob.glob(os.path.join(output_dir, "*")):
+        name = os.path.basename(path)
+        if name != "manifest.json" and name not in referenced:
+            os.remove(path)
+    return built
+
+if __name__ == "__main__":
+    import argparse
+    from config import SECRETS_PATH, EVENTS_DIR
+
+    parser = argparse.ArgumentParser(description="Create resized WebP/AVIF variants of the configured images")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--secrets", default=SECRETS_PATH,
+                        help=f"Path to secrets.toml (default: {SECRETS_PATH})")
+    args = parser.parse_args()
+
+    secrets_paths = [args.secrets] + sorted(glob.glob(os.path.join(EVENTS_DIR, "*", "secrets.toml")))
+    sources = sorted(glob.glob(os.path.join(IMAGES_DIR, "*"))) + configured_images(secrets_paths)
+    built = build_variants(sources)
+    print(f"Processed {built} images, {len(read_manifest())} available in {VARIANT_DIR} "
+          f"({', '.join(supported_formats())})")
@@ -0,0 +1,71 @@
+import pandas as pd
+
+from storage import TIMESTAMP_FORMAT
+
+# Menu choice columns and the [menu] list that defines their categories
+MENU_COLUMNS = {
+    "starter_choice": "starters",
+    "main_choice": "mains",
+    "dessert_choice": "desserts"
+}
+
+# Stored text of the attending column for True and False
+ATTENDING_VALUES = {True: "Yes", False: "No"}
+
+TEXT_DTYPE = pd.StringDtype("pyarrow")
+
+def _categories(config, column, values):
+    """The configured menu choices, then any stored choice no longer on the menu"""
+    categories = [str(choice) for choice in getattr(config, MENU_COLUMNS[column]) if str(choice)]
+    stored = values.dropna().astype(str)
+    extra = sorted(set(stored[stored != ""]) - set(categories))
+    return list(dict.fromkeys(categories)) + extra
+
+def typed_frame(df, config):
+    """Convert loaded RSVP rows to native types
+
+    timestamp becomes a datetime in the event timezone, attending a nullable
+    boolean, the menu choices categoricals of the [menu] lists, and every
+    other column pyarrow-backed text. The index is kept, so row positions
+    match the loaded frame.
+    """
+    typed = {}
+    for column in df.columns:
+        values = df[column]
+        if column == "timestamp":
+            timestamps = pd.to_datetime(values, errors="coerce", format=TIMESTAMP_FORMAT)
+            typed[column] = timestamps.dt.tz_localize(config.timezone, ambiguous="NaT", nonexistent="NaT")
+        elif column == "attending":
+            typed[column] = values.map({text: flag for flag, text in ATTENDING_VALUES.items()}).astype("boolean")
+        elif column in MENU_COLUMNS:
+            text = values.astype(object).where(values.notna() & (values != ""), None)
+            typed[column] = pd.Categorical(text, categories=_categories(config, column, values))
+        else:
+            typed[column] = values.astype(TEXT_DTYPE)
+    return pd.DataFrame(typed, index=df.index)
+
+def storage_value(column, value, config):
+    """Convert a typed value (e.g. from the data editor) back to its stored text"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if column == "attending" and isinstance(value, bool):
+        return ATTENDING_VALUES[value]
+    if column == "timestamp":
+        try:
+            timestamp = pd.Timestamp(value)
+        except ValueError:
+            return value
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.tz_convert(config.timezone)
+        return timestamp.strftime(TIMESTAMP_FORMAT)
+    return value
+
+def storage_row(row, config):
+    """Convert every value of a typed row back to its stored text"""
+    return {column: storage_value(column, value, config) for column, value in row.items()}
+
+def memory_report(frames):
+    """Deep memory use in bytes per column of named frames, e.g. {"Loaded": df, "Typed": typed}"""
+    report = pd.DataFrame({name: df.memory_usage(deep=True, index=False) for name, df in frames.items()})
+    report.loc["Total"] = report.sum()
+    return report
@@ -0,0 +1,166 @@
+import unicodedata
+import re
+import pandas as pd
+
+# Columns the admin search box looks in
+SEARCH_COLUMNS = ["contact_name", "guest_first_name", "guest_last_name", "contact_email"]
+PHONE_COLUMN = "contact_phone"
+
+# Query terms shorter than this are matched against word prefixes instead of trigrams
+TRIGRAM_LENGTH = 3
+
+# Phone numbers are indexed and matched on their digits, so "+1 (555) 123" finds "+15551234567"
+PHONE_QUERY = re.compile(r"^[\d+\-(). ]+$")
+WORD_SPLIT = re.compile(r"[\W_]+")
+
+# Results of this many recent queries are kept, and extended as rows are added
+CACHED_QUERIES = 16
+
+def normalize(text):
+    """Casefold text and strip accents, so "Chloé" and "chloe" compare equal"""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+def _digits(text):
+    return "".join(c for c in text if c.isdigit())
+
+def _cell_text(value):
+    """Text of a cell, or "" for a missing value"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        # Phone numbers without punctuation are parsed from CSV as numbers
+        return str(int(value))
+    return str(value)
+
+def _trigrams(text):
+    return {text[i:i + TRIGRAM_LENGTH] for i in range(len(text) - TRIGRAM_LENGTH + 1)}
+
+def _value_matches(term, value):
+    """Whether one normalized value matches a term, as _values_matching() finds it"""
+    if len(term) < TRIGRAM_LENGTH:
+        return any(word.startswith(term) for word in WORD_SPLIT.split(value))
+    return term in value
+
+class SearchIndex:
+    """In-memory index of names, emails and phone numbers by row position"""
+
+    def __init__(self):
+        self.version = None
+        self.row_count = 0
+        # Each distinct normalized value (a name, an email, a phone's digits) is
+        # indexed once, however many rows share it
+        # value -> row positions
+        self._rows = {}
+        # trigram -> values containing it
+        self._trigrams = {}
+        # one or two character word prefix -> values with a word starting with it
+        self._prefixes = {}
+        # Raw cell -> normalized value, since names repeat across rows
+        self._normalized = {}
+        # Terms of a recent query -> its matching row positions, in row order
+        self._results = {}
+
+    @classmethod
+    def from_frame(cls, df, version=None):
+        """Index every row of a full RSVP dataframe"""
+        index = cls()
+        index.version = version
+        if not df.empty:
+            index.add_rows(df.to_dict('records'))
+        return index
+
+    def add_rows(self, rsvp_rows):
+        """Index rows appended after the ones already indexed"""
+        for row in rsvp_rows:
+            self._add_row(row)
+
+    def _add_row(self, row):
+        position = self.row_count
+        self.row_count += 1
+
+        values = [self._normalize_cell(row.get(column)) for column in SEARCH_COLUMNS]
+        values.append(_digits(_cell_text(row.get(PHONE_COLUMN))))
+        for value in values:
+            self._add_value(value, position)
+
+        # Keep cached results current: the new position is the largest, so they stay sorted
+        for terms, positions in self._results.items():
+            if all(any(_value_matches(term, value) for value in values if value) for term in terms):
+                positions.append(position)
+
+    def _normalize_cell(self, value):
+        text = _cell_text(value)
+        normalized = self._normalized.get(text)
+        if normalized is None:
+            normalized = self._normalized[text] = normalize(text)
+        return normalized
+
+    def _add_value(self, value, position):
+        if not value:
+            return
+
+        positions = self._rows.get(value)
+        if positions is not None:
+            positions.add(position)
+            return
+
+        self._rows[value] = {position}
+        for trigram in _trigrams(value):
+            self._trigrams.setdefault(trigram, set()).add(value)
+        for word in WORD_SPLIT.split(value):
+            for length in range(1, min(len(word), TRIGRAM_LENGTH - 1) + 1):
+                self._prefixes.setdefault(word[:length], set()).add(value)
+
+    def _values_matching(self, term):
+        """Indexed values containing term, or with a word starting with a short term"""
+        if len(term) < TRIGRAM_LENGTH:
+            return self._prefixes.get(term, ())
+
+        postings = sorted((self._trigrams.get(trigram, set()) for trigram in _trigrams(term)), key=len)
+        # Trigrams narrow the candidates, the substring check removes false positives
+        return [value for value in postings[0].intersection(*postings[1:]) if term in value]
+
+    def _match_term(self, term):
+        """Row positions with a name, email or phone matching one normalized term"""
+        return set().union(*(self._rows[value] for value in self._values_matching(term)))
+
+    def _terms(self, query):
+        query = query.strip()
+        if PHONE_QUERY.match(query) and len(_digits(query)) >= TRIGRAM_LENGTH:
+            # The whole query looks like a phone number, e.g. "07700 900123"
+            return [_digits(query)]
+
+        terms = []
+        for term in normalize(query).split():
+            if PHONE_QUERY.match(term) and _digits(term):
+                term = _digits(term)
+            terms.append(term)
+        return terms
+
+    def search(self, query):
+        """Row positions matching every word of query, in row order"""
+        terms = tuple(self._terms(query))
+        if not terms:
+            return list(range(self.row_count))
+
+        results = self._results.get(terms)
+        if results is None:
+            results = self._match(terms)
+            if len(self._results) >= CACHED_QUERIES:
+                # Forget the oldest query
+                del self._results[next(iter(self._results))]
+            self._results[terms] = results
+        return list(results)
+
+    def _match(self, terms):
+        matches = None
+        # Longer terms are usually the most selective
+        for term in sorted(terms, key=len, reverse=True):
+            positions = self._match_term(term)
+            matches = positions if matches is None else matches & positions
+            if not matches:
+                return []
+        return sorted(matches)
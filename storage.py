@@ -0,0 +1,1447 @@
+import pandas as pd
+import os
+import csv
+import heapq
+import bisect
+import itertools
+import json
+import hashlib
+import sqlite3
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from aggregates import RsvpAggregates, _is_blank
+from search import SearchIndex
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+# Loaded frames are shared between sessions as shallow copies, which relies on
+# copy-on-write (the default from pandas 3) to keep callers from modifying them
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+# Unique id of each row, and of the submission (party) it was part of
+ID_COLUMNS = ["rsvp_id", "submission_id"]
+
+# Column order used when creating a new store
+RSVP_COLUMNS = ID_COLUMNS + [
+    "timestamp", "contact_name", "contact_email", "contact_phone", "attending",
+    "guest_first_name", "guest_last_name", "starter_choice", "main_choice",
+    "dessert_choice", "dietary_requirements", "comments"
+]
+
+# Columns compared by party_hash() when a submission is replayed
+CONTENT_COLUMNS = [column for column in RSVP_COLUMNS if column not in ID_COLUMNS + ["timestamp"]]
+
+# Format of the timestamp column, as written by the RSVP form
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Low-cardinality columns the Parquet backend stores dictionary-encoded
+DICTIONARY_COLUMNS = ["attending", "starter_choice", "main_choice", "dessert_choice"]
+
+# Column types of the Parquet backend; every other column is text
+PARQUET_SCHEMA = pa.schema([
+    (column,
+     pa.timestamp("s") if column == "timestamp"
+     else pa.dictionary(pa.int32(), pa.string()) if column in DICTIONARY_COLUMNS
+     else pa.string())
+    for column in RSVP_COLUMNS
+])
+
+# Number of Parquet files after which appends trigger a background compaction
+COMPACT_AFTER_FILES = 16
+
+# Newest rows kept by the recent activity feed: the most the summary page can list
+RECENT_CAPACITY = 100
+
+# Journal size in bytes after which the CSV backend checkpoints it into the CSV file
+JOURNAL_CHECKPOINT_BYTES = 256 * 1024
+
+# Columns the SQLite backend keeps an index on
+INDEXED_COLUMNS = ["rsvp_id", "submission_id", "contact_name", "contact_email", "attending", "timestamp"]
+
+@contextmanager
+def file_lock(lock_path, thread_lock):
+    """Hold an exclusive lock across threads (thread_lock) and processes (lock_path)"""
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+
+        with open(lock_path, 'a') as lock_f:
+            fcntl.flock(lock_f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_f, fcntl.LOCK_UN)
+
+def fsync_directory(path):
+    """Make a rename or new file in a directory survive a crash (a no-op where unsupported)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def replace_durably(tmp_path, path):
+    """Atomically rename a fully written and fsynced temporary file over path"""
+    os.replace(tmp_path, path)
+    fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+class Journal:
+    """Append-only write-ahead log of the CSV text appended since the last checkpoint
+
+    The first line records the CSV file's inode and size at the checkpoint;
+    every further line holds the text of one append. A torn last line is
+    from a write that was never acknowledged, and is ignored.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def start(self, inode, size):
+        """Atomically replace the journal with an empty one for a checkpoint at (inode, size)"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".journal_", suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"checkpoint": {"inode": inode, "size": size}}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        replace_durably(tmp_path, self.path)
+
+    def append(self, text):
+        """Log text and fsync it; returns the journal size"""
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({"csv": text}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
+
+    def read(self):
+        """(checkpoint, [appended text]) or (None, []) if there is no journal"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return None, []
+
+        records = []
+        for line in lines:
+            if not line.endswith("\n"):
+                break
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+        if not records or "checkpoint" not in records[0]:
+            return None, []
+        return records[0]["checkpoint"], [record["csv"] for record in records[1:]]
+
+class TokenIndex:
+    """Append-only file of committed idempotency tokens and the party hash stored under each
+
+    Every line is "<token> <party hash>"; a later line for the same token (a
+    replaced party) wins. Writers append under the store lock, and lookups
+    only parse the lines appended since the previous one, including those
+    of other processes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._hashes = {}
+        self._offset = 0
+        self._inode = None
+
+    def _refresh(self):
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            self._hashes, self._offset, self._inode = {}, 0, None
+            return
+        with f:
+            inode = os.fstat(f.fileno()).st_ino
+            if inode != self._inode:
+                # First read, or the file was replaced: start over
+                self._hashes, self._offset, self._inode = {}, 0, inode
+            f.seek(self._offset)
+            data = f.read()
+
+        # A torn last line is from a write that was never acknowledged
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].decode('utf-8').splitlines():
+            token, _, digest = line.partition(" ")
+            if token and digest:
+                self._hashes[token] = digest
+        self._offset += end
+
+    def get(self, token):
+        """Party hash committed under token, or None (called with the store lock held)"""
+        self._refresh()
+        return self._hashes.get(token)
+
+    def add(self, hashes):
+        """Record {token: party hash} of written submissions and fsync (called with the store lock held)"""
+        if not hashes:
+            return
+        text = "".join(f"{token} {digest}\n" for token, digest in hashes.items())
+        with open(self.path, 'ab+') as f:
+            # Start on a new line after a torn one
+            if f.tell() and (f.seek(-1, os.SEEK_END), f.read(1))[1] != b"\n":
+                text = "\n" + text
+            f.write(text.encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+
+def new_id():
+    return uuid.uuid4().hex
+
+def assign_ids(rsvp_rows):
+    """Copies of the rows of one submission with an rsvp_id each and a shared submission_id"""
+    submission_id = new_id()
+    return [
+        dict(row,
+             rsvp_id=new_id() if _is_blank(row.get('rsvp_id')) else row['rsvp_id'],
+             submission_id=submission_id if _is_blank(row.get('submission_id')) else row['submission_id'])
+        for row in rsvp_rows
+    ]
+
+def _content_text(value):
+    """Text of a cell for content hashing, so "5551234", 5551234 and 5551234.0 compare equal"""
+    if _is_blank(value):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def party_hash(rsvp_rows):
+    """Hash of the guest details of one submission, ignoring ids, timestamp and row order"""
+    rows = sorted(tuple(_content_text(row.get(column)) for column in CONTENT_COLUMNS) for row in rsvp_rows)
+    return hashlib.sha256(json.dumps(rows).encode()).hexdigest()
+
+def fill_missing_ids(df):
+    """Give rows written before ids existed an rsvp_id, and each party a submission_id
+
+    Guests of one party were only tied together by a shared timestamp and
+    contact name, so those identify the party when backfilling.
+    """
+    df = df.copy()
+    for column in ID_COLUMNS:
+        if column not in df.columns or pd.api.types.is_numeric_dtype(df[column]):
+            # Missing, or read from CSV as an all-empty float column
+            df[column] = df[column].astype(object) if column in df.columns else None
+
+    missing = df['rsvp_id'].isna() | (df['rsvp_id'] == '')
+    df.loc[missing, 'rsvp_id'] = [new_id() for _ in range(missing.sum())]
+
+    missing = df['submission_id'].isna() | (df['submission_id'] == '')
+    if missing.any():
+        parties = df.loc[missing, 'timestamp'].astype(str) + "\0" + df.loc[missing, 'contact_name'].astype(str)
+        party_ids = {party: new_id() for party in parties.unique()}
+        df.loc[missing, 'submission_id'] = parties.map(party_ids)
+
+    return df[ID_COLUMNS + [column for column in df.columns if column not in ID_COLUMNS]]
+
+def missing_id_count(df):
+    """Number of rows without an rsvp_id or submission_id"""
+    if df.empty:
+        return 0
+    if any(column not in df.columns for column in ID_COLUMNS):
+        return len(df)
+    ids = df[ID_COLUMNS]
+    return int((ids.isna() | (ids == '')).any(axis=1).sum())
+
+class RowIds:
+    """Hash index from rsvp_id to row position, and submission_id to row positions"""
+
+    def __init__(self):
+        self.version = None
+        self.row_count = 0
+        self._positions = {}
+        self._parties = {}
+
+    @classmethod
+    def from_frame(cls, df, version=None):
+        index = cls()
+        index.version = version
+        if not df.empty and 'rsvp_id' in df.columns:
+            index.add_rows(df[ID_COLUMNS].to_dict('records'))
+        return index
+
+    def add_rows(self, rsvp_rows):
+        """Index rows appended after the ones already indexed"""
+        for row in rsvp_rows:
+            position = self.row_count
+            self.row_count += 1
+            if not _is_blank(row.get('rsvp_id')):
+                self._positions[row['rsvp_id']] = position
+            if not _is_blank(row.get('submission_id')):
+                self._parties.setdefault(row['submission_id'], []).append(position)
+
+    def position(self, rsvp_id):
+        """Row position of rsvp_id, or None if there is no such row"""
+        return self._positions.get(rsvp_id)
+
+    def party(self, submission_id):
+        """Row positions of every guest in a submission"""
+        return list(self._parties.get(submission_id, ()))
+
+def _timestamp_key(value):
+    """Sort key of a stored timestamp; the text format sorts chronologically"""
+    return "" if _is_blank(value) else str(value)
+
+class RecentRows:
+    """Bounded buffer of the newest rows as (timestamp, row position), oldest first"""
+
+    def __init__(self):
+        self.version = None
+        self.row_count = 0
+        self._entries = []
+
+    @classmethod
+    def from_frame(cls, df, version=None):
+        index = cls()
+        index.version = version
+        if not df.empty and 'timestamp' in df.columns:
+            keys = [_timestamp_key(value) for value in df['timestamp']]
+            # Selecting the newest rows is O(N log k); the full frame is never sorted
+            index._entries = sorted(heapq.nlargest(RECENT_CAPACITY, zip(keys, range(len(keys)))))
+            index.row_count = len(keys)
+        return index
+
+    def add_rows(self, rsvp_rows):
+        """Add rows appended after the ones already seen, dropping the oldest entries"""
+        for row in rsvp_rows:
+            entry = (_timestamp_key(row.get('timestamp')), self.row_count)
+            self.row_count += 1
+            if len(self._entries) < RECENT_CAPACITY or entry > self._entries[0]:
+                # New submissions are normally the newest, so this appends at the end
+                bisect.insort(self._entries, entry)
+                if len(self._entries) > RECENT_CAPACITY:
+                    del self._entries[0]
+
+    def newest(self, limit, since=None):
+        """Row positions of up to limit newest rows, newest first, optionally only those after since"""
+        available = len(self._entries) if since is None else self.count_since(since)
+        entries = self._entries[len(self._entries) - min(limit, available):]
+        return [position for _, position in reversed(entries)]
+
+    def count_since(self, since):
+        """Number of rows newer than the timestamp since, at most RECENT_CAPACITY"""
+        return len(self._entries) - bisect.bisect_right(self._entries, (since, float("inf")))
+
+    def latest(self):
+        """Timestamp of the newest row, or "" if there are none"""
+        return self._entries[-1][0] if self._entries else ""
+
+# In-memory indexes over load(), each built once per store version
+INDEX_TYPES = {"search": SearchIndex, "ids": RowIds, "recent": RecentRows}
+
+class FrameCache:
+    """Process-wide cache of the last loaded frame, keyed on the store version"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._frame = None
+
+    def get(self, version, loader):
+        """Return the cached frame for version, calling loader() if it is stale"""
+        with self._lock:
+            # Loading under the lock lets concurrent sessions share one parse
+            if self._frame is None or version != self._version:
+                self._frame = loader()
+                self._version = version
+            return self._frame.copy(deep=False)
+
+class RsvpStore:
+    """Locking, caching and dashboard counters shared by the storage backends"""
+
+    backend = None
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self.stats_path = path + ".stats.json"
+        self.seen_path = path + ".seen.json"
+        self.tokens = TokenIndex(path + ".tokens")
+        self._thread_lock = threading.Lock()
+        self._cache = FrameCache()
+        self._aggregates = None
+        self._indexes = {}
+        # One lock per index, held only to look up or extend it; builds run
+        # outside them, so a write or another index never waits for one
+        self._index_locks = {name: threading.Lock() for name in INDEX_TYPES}
+
+    def lock(self):
+        """Exclusive lock on the store across threads and processes"""
+        return file_lock(self.lock_path, self._thread_lock)
+
+    def version(self):
+        """Identify the stored data; changes on every write"""
+        raise NotImplementedError
+
+    def _durable_version(self):
+        """The part of version() other processes can see, recorded in the sidecar"""
+        return self.version()
+
+    def content_version(self):
+        """Identify the stored data the same way in every process, e.g. to name files derived from it"""
+        return self._durable_version()
+
+    def _read(self):
+        """Read every row from storage, bypassing the cache"""
+        raise NotImplementedError
+
+    def _prepare_rows(self, rsvp_rows):
+        """Prepare rows for _write_rows() before the lock is taken"""
+        return rsvp_rows
+
+    def _write_rows(self, prepared_rows):
+        """Append prepared rows to storage (called with the lock held)"""
+        raise NotImplementedError
+
+    def _write_frame(self, df):
+        """Replace every stored row (called with the lock held)"""
+        raise NotImplementedError
+
+    def _write_edits(self, updated, deleted, added, prepared_rows):
+        """Apply edits by rsvp_id (called with the lock held); returns (old rows, new rows)"""
+        raise NotImplementedError
+
+    def backfill_ids(self):
+        """Add ids to rows stored before they existed; returns the number of rows changed"""
+        raise NotImplementedError
+
+    def recover(self):
+        """Repair storage after a crash; returns the number of writes recovered"""
+        return 0
+
+    def _edited_frame(self, updated, deleted, added):
+        """Apply edits by rsvp_id to a copy of the loaded frame; returns (frame, old rows, new rows)"""
+        with self._index("ids") as ids:
+            version = ids.version
+            # Skipping rows removed since the editor loaded them
+            updated = {ids.position(rsvp_id): changes for rsvp_id, changes in updated.items()
+                       if ids.position(rsvp_id) is not None}
+            deleted = [ids.position(rsvp_id) for rsvp_id in deleted if ids.position(rsvp_id) is not None]
+        df = self._cache.get(version, self._read)
+        # Row labels of the edited rows
+        updated = {df.index[position]: changes for position, changes in updated.items()}
+        deleted = [df.index[position] for position in deleted]
+        df, old_rows, updated_rows = self._edit_frame(df, updated, deleted)
+        if added:
+            df = pd.concat([df, pd.DataFrame(added)], ignore_index=True)
+        return df, old_rows, updated_rows + list(added)
+
+    @staticmethod
+    def _edit_frame(df, updated, deleted):
+        """Apply edits by row label to df; returns (edited frame, old rows, updated rows)"""
+        old_rows = df.loc[list(updated) + list(deleted)].to_dict('records')
+
+        df = df.drop(index=deleted)
+        for label, changes in updated.items():
+            for column, value in changes.items():
+                if not (df[column].dtype == object or isinstance(df[column].dtype, pd.StringDtype)):
+                    # Blank, numeric, categorical or datetime columns; widen them so any text fits
+                    df[column] = df[column].astype(object)
+                df.at[label, column] = value
+        return df, old_rows, df.loc[list(updated)].to_dict('records')
+
+    def load(self):
+        """Load every RSVP row, rereading storage only when it has changed"""
+        return self._cache.get(self.version(), self._read)
+
+    def append(self, rsvp_rows):
+        """Append the rows of one submission and update the dashboard counters in one locked operation"""
+        return self.append_submissions([rsvp_rows])[0]
+
+    def append_submissions(self, submissions):
+        """Append several submissions in one locked write (group commit); returns their submission_ids
+
+        A submission whose rows carry a submission_id that is already stored
+        (the idempotency token of a replayed form) is skipped if its guest
+        details are unchanged, and replaces the stored party if they differ.
+        """
+        # Only ids given by the caller can be stored already; new ones are not looked up
+        tokened = [bool(rsvp_rows) and not _is_blank(rsvp_rows[0].get('submission_id'))
+                   for rsvp_rows in submissions]
+        submissions = [assign_ids(rsvp_rows) for rsvp_rows in submissions]
+        submission_ids = [rsvp_rows[0]['submission_id'] if rsvp_rows else None for rsvp_rows in submissions]
+        rsvp_rows = [row for submission in submissions for row in submission]
+        if not rsvp_rows:
+            return submission_ids
+
+        prepared_rows = self._prepare_rows(rsvp_rows)
+        with self.lock():
+            new_rows, replaced, hashes = self._deduplicate(submissions, tokened)
+            if new_rows:
+                if len(new_rows) != len(rsvp_rows):
+                    prepared_rows = self._prepare_rows(new_rows)
+                before = self._durable_version()
+                before_version = self.version()
+                self._write_rows(prepared_rows)
+                self._update_aggregates(before, new_rows)
+                self._update_indexes(before_version, new_rows)
+
+            for old_rows, party_rows in replaced:
+                before = self._durable_version()
+                removed_rows, added_rows = self._write_edits(
+                    {}, [row['rsvp_id'] for row in old_rows], party_rows, self._prepare_rows(party_rows))
+                self._update_aggregates(before, added_rows, removed_rows)
+
+            # Recorded after the rows: a crash in between stores a replay twice
+            # rather than losing a submission
+            self._record_tokens(hashes)
+        return submission_ids
+
+    def _deduplicate(self, submissions, tokened):
+        """Split submissions into new rows, (stored rows, new rows) of changed parties
+        and {token: party hash} to record
+
+        Called with the lock held. Within one batch the last submission with
+        a token wins.
+        """
+        last = {rsvp_rows[0]['submission_id']: i
+                for i, (rsvp_rows, has_token) in enumerate(zip(submissions, tokened)) if has_token}
+
+        new_rows = []
+        replaced = []
+        hashes = {}
+        for i, (party_rows, has_token) in enumerate(zip(submissions, tokened)):
+            if not has_token:
+                new_rows.extend(party_rows)
+                continue
+            submission_id = party_rows[0]['submission_id']
+            if last[submission_id] != i:
+                continue
+
+            digest = party_hash(party_rows)
+            committed = self._committed_hash(submission_id)
+            if committed == digest:
+                # A replay of a stored submission: nothing to write
+                continue
+            # Changed details replace the stored party (if the admin has not deleted it)
+            stored_rows = self._party_rows(submission_id) if committed is not None else []
+            if stored_rows:
+                replaced.append((stored_rows, party_rows))
+            else:
+                new_rows.extend(party_rows)
+            hashes[submission_id] = digest
+        return new_rows, replaced, hashes
+
+    def _committed_hash(self, submission_id):
+        """Party hash stored under an idempotency token, or None (called with the lock held)"""
+        return self.tokens.get(submission_id)
+
+    def _record_tokens(self, hashes):
+        """Record the tokens of written submissions (called with the lock held)"""
+        self.tokens.add(hashes)
+
+    def _party_rows(self, submission_id):
+        """Stored rows of one submission as dicts, found through the ids index (for replaced parties only)"""
+        with self._index("ids") as index:
+            version, positions = index.version, index.party(submission_id)
+        if not positions:
+            return []
+        return self._cache.get(version, self._read).iloc[positions].to_dict('records')
+
+    def replace(self, df):
+        """Replace every stored row with the given dataframe"""
+        df = fill_missing_ids(df)
+        with self.lock():
+            self._write_frame(df)
+            self._save_aggregates(RsvpAggregates.from_frame(df))
+
+    def apply_edits(self, updated, deleted, added):
+        """Apply data editor changes by rsvp_id
+
+        updated maps an rsvp_id to {column: new value}, deleted lists rsvp_ids
+        and added lists new rows, each saved as its own submission. The
+        dashboard counters are adjusted by the old and new values of the
+        affected rows only.
+        """
+        updated = {rsvp_id: {column: value for column, value in changes.items() if column not in ID_COLUMNS}
+                   for rsvp_id, changes in updated.items() if rsvp_id not in deleted}
+        added = [assign_ids([row])[0] for row in added]
+        if not (updated or deleted or added):
+            return
+
+        prepared_rows = self._prepare_rows(added) if added else None
+        with self.lock():
+            before = self._durable_version()
+            old_rows, new_rows = self._write_edits(updated, deleted, added, prepared_rows)
+            self._update_aggregates(before, new_rows, old_rows)
+
+    def _update_aggregates(self, before, rsvp_rows, removed_rows=()):
+        """Count changed rows into the sidecar if it was current before the write"""
+        aggregates = self._aggregates
+        if aggregates is None or aggregates.version != before:
+            aggregates = RsvpAggregates.load(self.stats_path)
+
+        if aggregates is None or aggregates.version != before:
+            # Missing or stale sidecar: rebuilt on the next read
+            self._aggregates = None
+            return
+
+        if aggregates.contacts is None:
+            # Without the contact map the contact counters become pending: count on a
+            # (small) copy, so readers holding these counters never see them pending
+            aggregates = RsvpAggregates.from_dict(aggregates.to_dict())
+
+        # Updated in place: this and the small sidecar write cost O(rows written)
+        aggregates.remove_rows(removed_rows)
+        aggregates.add_rows(rsvp_rows)
+        self._save_aggregates(aggregates)
+
+    def _update_indexes(self, before_version, rsvp_rows):
+        """Add appended rows to the in-memory indexes that were current before the write
+
+        Called with the store lock held, so an index is never built here: a
+        missing or stale one is left for the next reader to rebuild.
+        """
+        version = self.version()
+        for name, lock in self._index_locks.items():
+            with lock:
+                index = self._indexes.get(name)
+                if index is None:
+                    continue
+                if index.version != before_version:
+                    del self._indexes[name]
+                    continue
+                index.add_rows(rsvp_rows)
+                index.version = version
+
+    @contextmanager
+    def _index(self, name):
+        """Hold the named index for the current version, building it if it is missing or stale
+
+        The index is built from the loaded frame without holding any lock, and
+        published only if no write changed the version meanwhile; keep the
+        body short, as appends wait for it.
+        """
+        version = self.version()
+        lock = self._index_locks[name]
+        with lock:
+            index = self._indexes.get(name)
+            if index is not None and index.version == version:
+                yield index
+                return
+
+        built = INDEX_TYPES[name].from_frame(self._cache.get(version, self._read), version)
+        with lock:
+            index = self._indexes.get(name)
+            if index is None or index.version != version:
+                index = built
+                if self.version() == version:
+                    self._indexes[name] = index
+            yield index
+
+    def search(self, query):
+        """Positions of the rows in load() whose names, email or phone match query"""
+        with self._index("search") as index:
+            return index.search(query)
+
+    def row_position(self, rsvp_id):
+        """Position of an rsvp_id in load(), or None if there is no such row"""
+        with self._index("ids") as index:
+            return index.position(rsvp_id)
+
+    def party(self, submission_id):
+        """Every guest row of one submission"""
+        with self._index("ids") as index:
+            version, positions = index.version, index.party(submission_id)
+        return self._cache.get(version, self._read).iloc[positions]
+
+    def _save_aggregates(self, aggregates):
+        aggregates.version = self._durable_version()
+        aggregates.save(self.stats_path)
+        self._aggregates = aggregates
+
+    def _current_aggregates(self, version):
+        """The in-memory or sidecar counters if they are for version, else None"""
+        aggregates = self._aggregates
+        if aggregates is None or aggregates.version != version:
+            aggregates = RsvpAggregates.load(self.stats_path)
+        if aggregates is None or aggregates.version != version:
+            return None
+        self._aggregates = aggregates
+        return aggregates
+
+    def aggregates(self):
+        """Dashboard counters for the current data, rebuilt if the sidecar is stale"""
+        version = self._durable_version()
+        aggregates = self._current_aggregates(version)
+        if aggregates is not None and aggregates.contacts_pending():
+            # Counted from the loaded rows outside the lock; only the small sidecar
+            # is saved under it, unless a write got there first
+            contacts = RsvpAggregates.count_contacts(self._cache.get(self.version(), self._read))
+            with self.lock():
+                if self._durable_version() != version or aggregates.version != version:
+                    aggregates = None
+                else:
+                    aggregates.set_contacts(contacts)
+                    aggregates.save(self.stats_path)
+
+        if aggregates is None:
+            return self.rebuild_aggregates(self._durable_version())
+        return aggregates
+
+    def rebuild_aggregates(self, version=None):
+        """Recompute the dashboard counters from scratch and rewrite the sidecar
+
+        If version is given and the counters became current for it while
+        waiting for the lock (another thread's write), those are returned.
+        """
+        with self.lock():
+            aggregates = self._current_aggregates(version) if version is not None else None
+            if aggregates is None or aggregates.contacts_pending():
+                aggregates = RsvpAggregates.from_frame(self._read())
+                self._save_aggregates(aggregates)
+        return aggregates
+
+    def check_aggregates(self):
+        """Compare the sidecar counters with a full recomputation"""
+        with self.lock():
+            stored = RsvpAggregates.load(self.stats_path)
+            if stored is None:
+                return ["sidecar file is missing or unreadable"]
+
+            problems = []
+            version = self._durable_version()
+            if stored.version != version:
+                problems.append(f"version: {stored.version} != {version}")
+            return problems + stored.differences(RsvpAggregates.from_frame(self._read()))
+
+    def summary(self):
+        """Contact and guest counts for the summary dashboard"""
+        return self.aggregates().summary()
+
+    def choice_counts(self, column):
+        """Count the menu choices in column among attending guests"""
+        return self.aggregates().choice_counts(column)
+
+    def dietary_requirements(self):
+        """Attending guests that reported dietary requirements"""
+        df = self.load()
+        if df.empty or 'dietary_requirements' not in df.columns:
+            return pd.DataFrame(columns=RSVP_COLUMNS)
+        attending_df = df[df['attending'] == 'Yes']
+        return attending_df[attending_df['dietary_requirements'].notna() &
+                            (attending_df['dietary_requirements'] != '')]
+
+    def recent(self, limit, since=None):
+        """Up to limit (at most RECENT_CAPACITY) newest RSVP rows, newest first
+
+        If since is given, only rows with a later timestamp are returned.
+        """
+        with self._index("recent") as index:
+            version, positions = index.version, index.newest(limit, since)
+        return self._cache.get(version, self._read).iloc[positions]
+
+    def count_since(self, since):
+        """Number of rows with a timestamp later than since, at most RECENT_CAPACITY"""
+        with self._index("recent") as index:
+            return index.count_since(since)
+
+    def latest_timestamp(self):
+        """Timestamp of the newest row, or "" if there are none"""
+        with self._index("recent") as index:
+            return index.latest()
+
+    def seen_cursor(self):
+        """Timestamp of the newest row the admins have seen, or "" if none is recorded"""
+        try:
+            with open(self.seen_path) as f:
+                return json.load(f)["cursor"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return ""
+
+    def mark_seen(self, cursor):
+        """Record that the admins have seen the rows up to the timestamp cursor
+
+        Kept in a small sidecar file, so it outlives admin sessions and is
+        shared by every server process. The cursor never moves back.
+        """
+        if not cursor or cursor <= self.seen_cursor():
+            return
+        directory = os.path.dirname(os.path.abspath(self.seen_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".seen_", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({"cursor": cursor}, f)
+            os.replace(tmp_path, self.seen_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+class CsvStore(RsvpStore):
+    """RSVP rows kept in a flat CSV file"""
+
+    backend = "csv"
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._generation = 0
+        self.journal = Journal(path + ".journal")
+
+    def version(self):
+        """Identify the file contents by (inode, size, mtime) plus local writes"""
+        return (self._generation, self._durable_version())
+
+    def _durable_version(self):
+        """The file's [inode, size, mtime], or None if it does not exist"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+    def _read(self):
+        if os.path.exists(self.path):
+            try:
+                # Every cell is read as text, so rewriting the file keeps values like
+                # phone numbers as written ("07700 900123", "5551234"); only empty
+                # cells are missing
+                return pd.read_csv(self.path, dtype=str, keep_default_na=False, na_values=[""])
+            except Exception:
+                return pd.DataFrame()
+        return pd.DataFrame()
+
+    def _read_header(self):
+        """Read the column names from the first line of the CSV file"""
+        with open(self.path, newline='') as f:
+            return next(csv.reader(f), [])
+
+    def _ends_with_newline(self):
+        """Check whether the CSV file ends with a line break"""
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) in (b"\n", b"\r")
+
+    def _prepare_rows(self, rsvp_rows):
+        # Render the rows before taking the lock so it is held only for the write
+        new_df = pd.DataFrame(rsvp_rows)
+        return new_df, new_df.reindex(columns=RSVP_COLUMNS).to_csv(index=False, header=False)
+
+    def _write_rows(self, prepared_rows):
+        new_df, rows_csv = prepared_rows
+
+        if not os.path.exists(self.journal.path):
+            # Also creates the file, so the rows below are always a plain append
+            self.checkpoint()
+
+        # Keep the column order of the existing file
+        columns = self._read_header() or RSVP_COLUMNS
+        if columns != RSVP_COLUMNS:
+            rows_csv = new_df.reindex(columns=columns).to_csv(index=False, header=False)
+        if not self._ends_with_newline():
+            rows_csv = "\n" + rows_csv
+
+        # The rows are durable once the journal is fsynced; the CSV file itself
+        # is only fsynced at checkpoints. One call writes a whole batch of
+        # submissions from the write queue, so they share one fsync
+        journal_size = self.journal.append(rows_csv)
+        with open(self.path, 'a', newline='', encoding='utf-8') as f:
+            f.write(rows_csv)
+        self._generation += 1
+
+        if journal_size >= JOURNAL_CHECKPOINT_BYTES:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Fsync the CSV file and start an empty journal (called with the lock held)"""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            self._swap_in(self._write_temp(pd.DataFrame(columns=RSVP_COLUMNS)))
+            return
+
+        with open(self.path, 'rb') as f:
+            os.fsync(f.fileno())
+            stat = os.fstat(f.fileno())
+        self.journal.start(stat.st_ino, stat.st_size)
+
+    def recover(self):
+        """Replay journaled appends that did not reach the CSV file intact"""
+        with self.lock():
+            checkpoint, appends = self.journal.read()
+            if checkpoint is None:
+                return 0
+
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                stat = None
+            if stat is None or stat.st_ino != checkpoint["inode"] or stat.st_size < checkpoint["size"]:
+                # The file was replaced whole since the journal started, and
+                # so already holds every row
+                self.checkpoint()
+                return 0
+
+            expected = "".join(appends).encode('utf-8')
+            with open(self.path, 'rb') as f:
+                f.seek(checkpoint["size"])
+                if f.read() == expected:
+                    # Nothing was lost; make it durable and empty the journal
+                    self.checkpoint()
+                    return 0
+
+                # Rebuild the file from its checkpointed part and the journal,
+                # dropping whatever torn write followed
+                f.seek(0)
+                directory = os.path.dirname(os.path.abspath(self.path))
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".rsvps_", suffix=".tmp")
+                with os.fdopen(fd, 'wb') as out:
+                    out.write(f.read(checkpoint["size"]))
+                    out.write(expected)
+                    out.flush()
+                    os.fsync(out.fileno())
+            self._swap_in(tmp_path)
+            self._aggregates = None
+            return len(appends)
+
+    def _write_temp(self, df):
+        """Write df to a temporary file next to the CSV file and return its path"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".rsvps_", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+                df.to_csv(f, index=False)
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        return tmp_path
+
+    def _swap_in(self, tmp_path):
+        """Atomically replace the CSV file so readers never see a partial file (called with the lock held)"""
+        try:
+            replace_durably(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._generation += 1
+        # The new file holds every row, so the journal starts again from it
+        stat = os.stat(self.path)
+        self.journal.start(stat.st_ino, stat.st_size)
+
+    def replace(self, df):
+        """Replace the whole file with the given dataframe"""
+        df = fill_missing_ids(df)
+        tmp_path = self._write_temp(df)
+        with self.lock():
+            self._swap_in(tmp_path)
+            self._save_aggregates(RsvpAggregates.from_frame(df))
+
+    def _write_edits(self, updated, deleted, added, prepared_rows):
+        if not updated and not deleted:
+            # New rows alone are a plain append
+            self._write_rows(prepared_rows)
+            return [], added
+
+        # A CSV file cannot be changed in place, so the edited frame is written
+        # out whole; only the counters are updated from the changed rows
+        df, old_rows, new_rows = self._edited_frame(updated, deleted, added)
+        self._swap_in(self._write_temp(df))
+        return old_rows, new_rows
+
+    def backfill_ids(self):
+        with self.lock():
+            df = self._read()
+            missing = missing_id_count(df)
+            if missing:
+                df = fill_missing_ids(df)
+                self._swap_in(self._write_temp(df))
+                self._save_aggregates(RsvpAggregates.from_frame(df))
+        return missing
+
+class ParquetStore(RsvpStore):
+    """RSVP rows kept as Parquet files in a directory, listed in order by a manifest
+
+    Appends add a small segment file; once there are COMPACT_AFTER_FILES files
+    they are merged into one in a background thread.
+    """
+
+    backend = "parquet"
+
+    def __init__(self, path):
+        super().__init__(path)
+        os.makedirs(path, exist_ok=True)
+        self.manifest_path = os.path.join(path, "manifest.json")
+        # (manifest file stat, parsed manifest), reread only when the file changes
+        self._manifest_cache = (None, None)
+        # Data file name -> number of rows; files never change once written
+        self._file_rows = {}
+        self._compaction_lock = threading.Lock()
+
+    def _manifest(self):
+        """The current manifest: data files in order, generation and bookkeeping"""
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return {"generation": 0, "files": [], "obsolete": []}
+
+        key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        cached_key, manifest = self._manifest_cache
+        if key != cached_key:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            self._manifest_cache = (key, manifest)
+        return manifest
+
+    def _commit(self, files, removed=(), bump=True, **extra):
+        """Atomically publish a new list of data files (called with the lock held)
+
+        Files replaced by the previous commit are deleted now rather than then,
+        so readers that had just read the old manifest can still open them.
+        """
+        manifest = self._manifest()
+        for name in manifest["obsolete"]:
+            try:
+                os.remove(os.path.join(self.path, name))
+            except FileNotFoundError:
+                pass
+
+        manifest = dict(manifest, files=list(files), obsolete=list(removed),
+                        generation=manifest["generation"] + (1 if bump else 0), **extra)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix=".manifest_", suffix=".tmp")
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        # Data files are fsynced when written, so the manifest never lists a lost file
+        replace_durably(tmp_path, self.manifest_path)
+
+    def version(self):
+        """Generation counter bumped by every write; compaction leaves it unchanged"""
+        return self._manifest()["generation"]
+
+    @staticmethod
+    def _to_table(df):
+        """Convert rows to the Parquet schema: native timestamps, dictionary-encoded choices"""
+        arrays = []
+        for field in PARQUET_SCHEMA:
+            if field.name in df.columns:
+                values = df[field.name]
+            else:
+                values = pd.Series([None] * len(df), dtype=object)
+
+            if field.name == "timestamp":
+                timestamps = pd.to_datetime(values, errors="coerce", format=TIMESTAMP_FORMAT)
+                # Timestamps typed in by hand in the data editor may use another format
+                unparsed = timestamps.isna() & values.notna()
+                if unparsed.any():
+                    timestamps[unparsed] = pd.to_datetime(values[unparsed], errors="coerce", format="mixed")
+                arrays.append(pa.array(timestamps, type=field.type, from_pandas=True))
+            else:
+                text = pa.array(values.astype("string"), type=pa.string(), from_pandas=True)
+                arrays.append(text.dictionary_encode() if field.name in DICTIONARY_COLUMNS else text)
+        return pa.Table.from_arrays(arrays, schema=PARQUET_SCHEMA)
+
+    def _write_file(self, table):
+        """Write a new data file and return its name; it is unused until committed"""
+        name = f"part-{new_id()}.parquet"
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix=".part_", suffix=".tmp")
+        os.close(fd)
+        pq.write_table(table, tmp_path, compression="zstd")
+        with open(tmp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.path, name))
+        return name
+
+    def _read_files(self, files):
+        tables = [pq.read_table(os.path.join(self.path, name), schema=PARQUET_SCHEMA) for name in files]
+        return pa.concat_tables(tables)
+
+    @staticmethod
+    def _to_frame(table):
+        # The rest of the app works with timestamps in their text form
+        column = table.schema.get_field_index("timestamp")
+        table = table.set_column(column, "timestamp", pc.strftime(table["timestamp"], TIMESTAMP_FORMAT))
+        return table.to_pandas()
+
+    def _row_counts(self, files):
+        """Number of rows in each data file, read from the file footers once per file"""
+        self._file_rows = {name: self._file_rows.get(name) or
+                           pq.read_metadata(os.path.join(self.path, name)).num_rows for name in files}
+        return [self._file_rows[name] for name in files]
+
+    def _read(self):
+        # A concurrent compaction can delete files listed in a manifest read just
+        # before it; read the new manifest and try again
+        for _ in range(3):
+            files = self._manifest()["files"]
+            if not files:
+                return pd.DataFrame()
+            try:
+                table = self._read_files(files)
+            except FileNotFoundError:
+                continue
+            return self._to_frame(table)
+        raise RuntimeError(f"Could not read a consistent set of files from {self.path}")
+
+    def _prepare_rows(self, rsvp_rows):
+        # Encode the segment before taking the lock
+        return self._to_table(pd.DataFrame(rsvp_rows))
+
+    def _write_rows(self, prepared_rows):
+        manifest = self._manifest()
+        self._commit(manifest["files"] + [self._write_file(prepared_rows)])
+        if len(manifest["files"]) + 1 >= COMPACT_AFTER_FILES:
+            self.start_compaction()
+
+    def _write_frame(self, df):
+        self._commit([self._write_file(self._to_table(df))], removed=self._manifest()["files"])
+
+    def _write_edits(self, updated, deleted, added, prepared_rows):
+        if not updated and not deleted:
+            # New rows alone are a new segment
+            self._write_rows(prepared_rows)
+            return [], added
+
+        edited = self._edit_segments(updated, deleted)
+        if edited is None:
+            df, old_rows, new_rows = self._edited_frame(updated, deleted, added)
+            self._write_frame(df)
+            return old_rows, new_rows
+
+        files, removed, old_rows, new_rows = edited
+        if added:
+            files.append(self._write_file(prepared_rows))
+        self._commit(files, removed=removed)
+        return old_rows, new_rows + list(added)
+
+    def _edit_segments(self, updated, deleted):
+        """Rewrite only the data files holding edited rows (called with the lock held)
+
+        Returns (new file list, replaced files, old rows, updated rows), or
+        None if an edited row was not where the ids index placed it.
+        """
+        files = self._manifest()["files"]
+        with self._index("ids") as ids:
+            positions = [(rsvp_id, ids.position(rsvp_id)) for rsvp_id in list(updated) + list(deleted)]
+        # Row position at which each file starts; compaction keeps the row order
+        starts = list(itertools.accumulate(self._row_counts(files), initial=0))
+        edited_ids = {}
+        for rsvp_id, position in positions:
+            if position is not None:
+                # Rows removed since the editor loaded them are skipped
+                edited_ids.setdefault(bisect.bisect_right(starts, position) - 1, set()).add(rsvp_id)
+
+        edited_frames = {}
+        old_rows = []
+        new_rows = []
+        for i, rsvp_ids in sorted(edited_ids.items()):
+            df = self._to_frame(self._read_files([files[i]]))
+            labels = {rsvp_id: label for label, rsvp_id in df['rsvp_id'].items() if rsvp_id in rsvp_ids}
+            if len(labels) != len(rsvp_ids):
+                return None
+            edited_frames[i], file_old_rows, file_new_rows = self._edit_frame(
+                df, {labels[rsvp_id]: changes for rsvp_id, changes in updated.items() if rsvp_id in labels},
+                [labels[rsvp_id] for rsvp_id in deleted if rsvp_id in labels])
+            old_rows.extend(file_old_rows)
+            new_rows.extend(file_new_rows)
+
+        new_files = list(files)
+        for i, df in edited_frames.items():
+            # A file left empty is dropped from the list
+            new_files[i] = self._write_file(self._to_table(df)) if not df.empty else None
+        removed = [files[i] for i in edited_frames]
+        return [name for name in new_files if name is not None], removed, old_rows, new_rows
+
+    def backfill_ids(self):
+        with self.lock():
+            df = self._read()
+            missing = missing_id_count(df)
+            if missing:
+                df = fill_missing_ids(df)
+                self._write_frame(df)
+                self._save_aggregates(RsvpAggregates.from_frame(df))
+        return missing
+
+    def compact(self):
+        """Merge every data file into one; returns False if there was nothing to merge"""
+        with self.lock():
+            files = list(self._manifest()["files"])
+        if len(files) < 2:
+            return False
+
+        # Files are immutable once committed, so they are merged without the lock
+        try:
+            name = self._write_file(self._read_files(files).unify_dictionaries().combine_chunks())
+        except FileNotFoundError:
+            # Replaced while compacting
+            return False
+
+        with self.lock():
+            current = self._manifest()["files"]
+            if current[:len(files)] != files:
+                # Replaced while compacting
+                os.remove(os.path.join(self.path, name))
+                return False
+            # Same rows, so the generation (and every cache keyed on it) is unchanged
+            self._commit([name] + current[len(files):], removed=files, bump=False)
+        return True
+
+    def start_compaction(self):
+        """Compact in a background thread unless a compaction is already running"""
+        if self._compaction_lock.acquire(blocking=False):
+            threading.Thread(target=self._compact_in_background, daemon=True).start()
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        finally:
+            self._compaction_lock.release()
+
+    def migrate_from_csv(self, csv_path):
+        """Import an existing CSV file once; later calls are no-ops"""
+        with self.lock():
+            if self._manifest().get("migrated_from_csv"):
+                return 0
+
+            df = CsvStore(csv_path).load()
+            files = [self._write_file(self._to_table(df))] if not df.empty else []
+            self._commit(files + self._manifest()["files"], migrated_from_csv=csv_path)
+        return len(df)
+
+class SqliteStore(RsvpStore):
+    """RSVP rows kept in an indexed SQLite database (WAL mode)"""
+
+    backend = "sqlite"
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._create_schema()
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection, committing on success and rolling back on error"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            # Every commit is fsynced; the write queue batches submissions so
+            # concurrent guests share one transaction
+            conn.execute("PRAGMA synchronous=FULL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _create_schema(self):
+        """Create the table, indexes and metadata table if they do not exist"""
+        columns = ", ".join(f"{column} TEXT" for column in RSVP_COLUMNS)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS rsvps (id INTEGER PRIMARY KEY, {columns})")
+            # Databases created before the id columns existed
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(rsvps)")}
+            for column in RSVP_COLUMNS:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE rsvps ADD COLUMN {column} TEXT")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', '0')")
+            for column in INDEXED_COLUMNS:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_rsvps_{column} ON rsvps ({column})")
+
+    @staticmethod
+    def _row_values(rsvp_data):
+        """Column values for one row, storing blanks as NULL like an empty CSV cell"""
+        values = []
+        for column in RSVP_COLUMNS:
+            value = rsvp_data.get(column)
+            if value is None or (not isinstance(value, str) and pd.isna(value)) or value == "":
+                values.append(None)
+            else:
+                values.append(str(value))
+        return values
+
+    def _insert(self, conn, rsvp_rows):
+        placeholders = ", ".join("?" for _ in RSVP_COLUMNS)
+        conn.executemany(
+            f"INSERT INTO rsvps ({', '.join(RSVP_COLUMNS)}) VALUES ({placeholders})",
+            [self._row_values(row) for row in rsvp_rows]
+        )
+
+    @staticmethod
+    def _bump_generation(conn):
+        conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'")
+
+    def _query(self, sql, params=()):
+        with self._connect() as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def version(self):
+        """Generation counter bumped by every write transaction"""
+        with self._connect() as conn:
+            return int(conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0])
+
+    def _read(self):
+        df = self._query(f"SELECT {', '.join(RSVP_COLUMNS)} FROM rsvps ORDER BY id")
+        if df.empty:
+            return pd.DataFrame()
+        return df
+
+    @staticmethod
+    def _rows_by_id(conn, rsvp_ids):
+        """Rows with the given rsvp_ids, as dicts, skipping ids that no longer exist"""
+        rows = []
+        for rsvp_id in rsvp_ids:
+            values = conn.execute(f"SELECT {', '.join(RSVP_COLUMNS)} FROM rsvps WHERE rsvp_id = ?",
+                                  (rsvp_id,)).fetchone()
+            if values is not None:
+                rows.append(dict(zip(RSVP_COLUMNS, values)))
+        return rows
+
+    def _write_rows(self, prepared_rows):
+        with self._connect() as conn:
+            self._insert(conn, prepared_rows)
+            self._bump_generation(conn)
+
+    def _write_frame(self, df):
+        rsvp_rows = df.to_dict('records')
+        with self._connect() as conn:
+            conn.execute("DELETE FROM rsvps")
+            self._insert(conn, rsvp_rows)
+            self._bump_generation(conn)
+
+    def _write_edits(self, updated, deleted, added, prepared_rows):
+        with self._connect() as conn:
+            old_rows = self._rows_by_id(conn, list(updated) + list(deleted))
+
+            for rsvp_id, changes in updated.items():
+                columns = [column for column in changes if column in RSVP_COLUMNS]
+                if columns:
+                    values = self._row_values(changes)
+                    conn.execute(
+                        f"UPDATE rsvps SET {', '.join(f'{column} = ?' for column in columns)} WHERE rsvp_id = ?",
+                        [values[RSVP_COLUMNS.index(column)] for column in columns] + [rsvp_id]
+                    )
+            conn.executemany("DELETE FROM rsvps WHERE rsvp_id = ?", [(rsvp_id,) for rsvp_id in deleted])
+            if added:
+                self._insert(conn, prepared_rows)
+
+            updated_rows = self._rows_by_id(conn, list(updated))
+            self._bump_generation(conn)
+        return old_rows, updated_rows + list(added)
+
+    def backfill_ids(self):
+        with self.lock(), self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, rsvp_id, submission_id, timestamp, contact_name FROM rsvps"
+                " WHERE rsvp_id IS NULL OR submission_id IS NULL ORDER BY id"
+            ).fetchall()
+            if not rows:
+                return 0
+
+            # Guests of one party share the submission timestamp and contact name
+            party_ids = {}
+            updates = []
+            for row_id, rsvp_id, submission_id, timestamp, contact_name in rows:
+                if submission_id is None:
+                    submission_id = party_ids.setdefault((timestamp, contact_name), new_id())
+                updates.append((rsvp_id or new_id(), submission_id, row_id))
+            conn.executemany("UPDATE rsvps SET rsvp_id = ?, submission_id = ? WHERE id = ?", updates)
+            self._bump_generation(conn)
+        return len(rows)
+
+    def _party_rows(self, submission_id):
+        """Stored rows of one submission as dicts, found through the submission_id index"""
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT {', '.join(RSVP_COLUMNS)} FROM rsvps WHERE submission_id = ?",
+                                (submission_id,)).fetchall()
+        return [dict(zip(RSVP_COLUMNS, values)) for values in rows]
+
+    def _committed_hash(self, submission_id):
+        """Party hash of the rows stored under a token, looked up through the submission_id index"""
+        rsvp_rows = self._party_rows(submission_id)
+        return party_hash(rsvp_rows) if rsvp_rows else None
+
+    def _record_tokens(self, hashes):
+        """Nothing to record: tokens are the stored submission_ids"""
+
+    def dietary_requirements(self):
+        """Attending guests that reported dietary requirements"""
+        return self._query(
+            f"SELECT {', '.join(RSVP_COLUMNS)} FROM rsvps"
+            " WHERE attending = 'Yes' AND dietary_requirements IS NOT NULL"
+            " AND dietary_requirements != '' ORDER BY id"
+        )
+
+    def recent(self, limit, since=None):
+        """Up to limit newest RSVP rows, newest first, read through the timestamp index"""
+        limit = min(limit, RECENT_CAPACITY)
+        if since is None:
+            return self._query(
+                f"SELECT {', '.join(RSVP_COLUMNS)} FROM rsvps ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (limit,)
+            )
+        return self._query(
+            f"SELECT {', '.join(RSVP_COLUMNS)} FROM rsvps WHERE timestamp > ?"
+            " ORDER BY timestamp DESC, id DESC LIMIT ?",
+            (since, limit)
+        )
+
+    def count_since(self, since):
+        """Number of rows with a timestamp later than since, at most RECENT_CAPACITY"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM (SELECT 1 FROM rsvps WHERE timestamp > ? LIMIT ?)",
+                (since, RECENT_CAPACITY)
+            ).fetchone()[0]
+
+    def latest_timestamp(self):
+        """Timestamp of the newest row, or "" if there are none"""
+        with self._connect() as conn:
+            return conn.execute("SELECT MAX(timestamp) FROM rsvps").fetchone()[0] or ""
+
+    def migrate_from_csv(self, csv_path):
+        """Import an existing CSV file once; later calls are no-ops"""
+        with self.lock(), self._connect() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from_csv'").fetchone():
+                return 0
+
+            df = CsvStore(csv_path).load()
+            rsvp_rows = df.to_dict('records') if not df.empty else []
+            self._insert(conn, rsvp_rows)
+            self._bump_generation(conn)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_from_csv', ?)", (csv_path,))
+        return len(rsvp_rows)
+
+def open_store(files_config):
+    """Open the storage backend selected in the [files] configuration"""
+    backend = files_config.get("backend", "csv")
+    csv_file = files_config["csv_file"]
+
+    if backend == "csv":
+        store = CsvStore(csv_file)
+    elif backend == "sqlite":
+        sqlite_file = files_config.get("sqlite_file", os.path.splitext(csv_file)[0] + ".db")
+        store = SqliteStore(sqlite_file)
+        if os.path.exists(csv_file):
+            store.migrate_from_csv(csv_file)
+    elif backend == "parquet":
+        store = ParquetStore(files_config.get("parquet_dir", os.path.splitext(csv_file)[0] + ".parquet"))
+        if os.path.exists(csv_file):
+            store.migrate_from_csv(csv_file)
+    else:
+        raise ValueError(f"Unknown storage backend: {backend}")
+
+    # Replay writes interrupted by a crash, then give rows saved before
+    # rsvp_id/submission_id existed their ids
+    store.recover()
+    store.backfill_ids()
+    return store
@@ -0,0 +1,86 @@
+import multiprocessing
+import os
+import threading
+
+import pytest
+
+from storage import open_store
+
+PROCESSES = 2
+THREADS = 4
+SUBMISSIONS = 10
+GUESTS = 3
+
+def _files(directory, backend):
+    return {
+        "backend": backend,
+        "csv_file": os.path.join(directory, "rsvps.csv"),
+        "sqlite_file": os.path.join(directory, "rsvps.db"),
+    }
+
+def _submission(worker, thread, number):
+    """The rows of one multi-guest submission, named after who wrote it"""
+    contact_name = f"Contact {worker}-{thread}-{number}"
+    return [
+        {
+            "timestamp": "2025-06-01 12:00:00",
+            "contact_name": contact_name,
+            "attending": "Yes",
+            "guest_first_name": f"Guest {guest}",
+            "guest_last_name": contact_name,
+            "starter_choice": "Soup",
+        }
+        for guest in range(GUESTS)
+    ]
+
+def append_from_threads(files, worker):
+    """Append SUBMISSIONS submissions from each of THREADS threads sharing one store"""
+    store = open_store(files)
+    errors = []
+
+    def append(thread):
+        try:
+            for number in range(SUBMISSIONS):
+                store.append(_submission(worker, thread, number))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=append, args=(thread,)) for thread in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+@pytest.mark.parametrize("backend", ["csv", "sqlite"])
+def test_concurrent_appends_lose_no_rows(tmp_path, backend):
+    files = _files(str(tmp_path), backend)
+    # Create the store (and its file) before the writers race to open it
+    open_store(files)
+
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=append_from_threads, args=(files, worker))
+                 for worker in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    # This process writes too, from its own threads
+    append_from_threads(files, PROCESSES)
+    for process in processes:
+        process.join(120)
+        assert process.exitcode == 0
+
+    df = open_store(files).load()
+    writers = PROCESSES + 1
+    assert len(df) == writers * THREADS * SUBMISSIONS * GUESTS
+    assert df["rsvp_id"].is_unique
+
+    # Every submission is stored whole: all of its guests under one submission_id
+    parties = df.groupby("submission_id")
+    assert parties.ngroups == writers * THREADS * SUBMISSIONS
+    assert (parties.size() == GUESTS).all()
+    assert (parties["contact_name"].nunique() == 1).all()
+    assert df["contact_name"].nunique() == writers * THREADS * SUBMISSIONS
+
+    # The dashboard counters saw every row too
+    assert open_store(files).summary()["total_rows"] == len(df)
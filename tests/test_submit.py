@@ -0,0 +1,84 @@
+import os
+
+from streamlit.testing.v1 import AppTest
+
+import config
+from benchmark import write_fixture_secrets
+from storage import open_store
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+def _use_secrets(monkeypatch, directory):
+    """Point the app at a fresh secrets.toml in directory; returns its settings"""
+    secrets_path, secrets = write_fixture_secrets(directory, "csv")
+    monkeypatch.setenv("RSVP_SECRETS_FILE", secrets_path)
+    monkeypatch.setattr(config, "SECRETS_PATH", secrets_path)
+    monkeypatch.setattr(config, "_registry", config.EventRegistry(config.MAX_ACTIVE_EVENTS))
+    return secrets
+
+def _count_script_runs(monkeypatch):
+    """List that gets an entry per script run (app.py selects the event at the top of every run)"""
+    runs = []
+    select_event = config.select_event
+
+    def counted(name):
+        runs.append(name)
+        return select_event(name)
+
+    monkeypatch.setattr(config, "select_event", counted)
+    return runs
+
+def _fill_form(at):
+    at.text_input(key="contact_name").set_value("Ada Lovelace")
+    guest_id = at.session_state.guests[0]["id"]
+    at.text_input(key=f"guest_{guest_id}_first_name").set_value("Ada")
+    at.text_input(key=f"guest_{guest_id}_last_name").set_value("Lovelace")
+    for field in ["starter", "main", "dessert"]:
+        selectbox = at.selectbox(key=f"guest_{guest_id}_{field}")
+        selectbox.set_value(selectbox.options[1])
+    return at.run()
+
+def _submit_button(at):
+    return next(button for button in at.button if button.label == "Submit RSVP")
+
+def test_submit_takes_one_script_run(tmp_path, monkeypatch):
+    secrets = _use_secrets(monkeypatch, str(tmp_path))
+    runs = _count_script_runs(monkeypatch)
+
+    at = _fill_form(AppTest.from_file(APP, default_timeout=30).run())
+    assert not at.exception
+
+    runs.clear()
+    _submit_button(at).click().run()
+
+    assert len(runs) == 1
+    assert not at.exception
+    assert [success.value for success in at.success] == [
+        "RSVP submitted successfully! Thank you for your response."
+    ]
+    assert len(open_store(secrets["files"]).load()) == 1
+
+    # The confirmation offers no second submit
+    assert not [button for button in at.button if button.label == "Submit RSVP"]
+
+    # Submitting the same form again, e.g. from a page rendered before the
+    # confirmation, adds nothing: it carries the same idempotency token
+    at.session_state.form_submitted = False
+    _fill_form(at.run())
+    _submit_button(at).click().run()
+    assert not at.exception
+    assert at.session_state.form_submitted
+    assert len(open_store(secrets["files"]).load()) == 1
+
+def test_invalid_submit_shows_errors_in_the_same_run(tmp_path, monkeypatch):
+    secrets = _use_secrets(monkeypatch, str(tmp_path))
+    runs = _count_script_runs(monkeypatch)
+
+    at = AppTest.from_file(APP, default_timeout=30).run()
+    runs.clear()
+    _submit_button(at).click().run()
+
+    assert len(runs) == 1
+    assert "• Primary contact name is required" in [error.value for error in at.error]
+    assert not at.session_state.form_submitted
+    assert open_store(secrets["files"]).load().empty
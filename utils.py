@@ -1,98 +1,243 @@
 import streamlit as st
-import pandas as pd
-import os
 from datetime import datetime, timedelta
 import pytz
+from collections import namedtuple
 
-# CSV file path
-CSV_FILE = st.secrets["files"]["csv_file"]
+from config import get_config, get_event
+from storage import open_store, new_id
+from exports import ExportCache
+from writer import WriteQueue, WriteQueueClosed, ACK_TIMEOUT
+from schema import typed_frame
+
+# Stores, export caches and cached frames live in each event's resources, so
+# they are released together when the event is evicted from the registry
+def _event_resource(event, key, factory):
+    """A resource of an event, created by factory() the first time it is needed"""
+    resource = event.resources.get(key)
+    if resource is None:
+        with event.lock:
+            resource = event.resources.get(key)
+            if resource is None and not event.closed:
+                resource = event.resources[key] = factory()
+        if resource is None:
+            # Evicted since it was looked up: use the event as opened again
+            return _event_resource(get_event(event.name), key, factory)
+    return resource
+
+def get_store(event_name=None):
+    """The RSVP storage backend selected in an event's [files] configuration
+
+    Uses the current session's event unless event_name is given. Stores are
+    keyed on the [files] configuration they were opened with.
+    """
+    event = get_event(event_name)
+    files_config = event.config_file.get().files
+    key = ("store",) + tuple(sorted(files_config.items()))
+    return _event_resource(event, key, lambda: open_store(files_config))
 
 def load_rsvps():
-    """Load existing RSVP data from CSV file"""
-    if os.path.exists(CSV_FILE):
-        try:
-            return pd.read_csv(CSV_FILE)
-        except:
-            return pd.DataFrame()
-    return pd.DataFrame()
+    """Load existing RSVP data from the configured store (cached until it changes)"""
+    return get_store().load()
+
+def load_typed_rsvps():
+    """Loaded RSVP data with native column types, converted once per data and config version"""
+    event = get_event()
+    config = event.config_file.get()
+    store = get_store()
+    key = (store.path, store.version(), config.version)
+    # Typed frame for the (store, store version, config version) it was converted from
+    cached_key, typed = event.resources.get("typed_rsvps", (None, None))
+    if cached_key != key:
+        typed = typed_frame(store.load(), config)
+        event.resources["typed_rsvps"] = (key, typed)
+    return typed.copy(deep=False)
+
+def get_write_queue(event_name=None):
+    """The background writer of an event's store"""
+    event = get_event(event_name)
+    store = get_store(event.name)
+    return _event_resource(event, ("writer", store.path), lambda: WriteQueue(store))
+
+def new_submission_token():
+    """An idempotency token for one rendered RSVP form, used as its submission_id"""
+    return new_id()
+
+def commit_rsvps(rsvp_rows, token=None):
+    """Write all rows of one submission to the store in a single atomic operation
+
+    The rows are handed to the store's background writer, which writes
+    submissions from concurrent sessions together, and this waits until they
+    are stored. Returns the submission_id; raises WriteQueueFull if too many
+    submissions are already waiting.
+
+    With a token (see new_submission_token()) the rows are stored under that
+    submission_id, so committing the same form again leaves the store
+    unchanged, or replaces the party's rows if the details were changed.
+    """
+    if not rsvp_rows:
+        return None
+    if token:
+        rsvp_rows = [dict(row, submission_id=token) for row in rsvp_rows]
+    try:
+        return get_write_queue().submit(rsvp_rows).result(timeout=ACK_TIMEOUT)
+    except WriteQueueClosed:
+        # The event was evicted while the rows were being queued; nothing was
+        # written, so they go to the writer of the event as opened again
+        return get_write_queue().submit(rsvp_rows).result(timeout=ACK_TIMEOUT)
 
 def save_rsvp(rsvp_data):
-    """Save RSVP data to CSV file"""
-    df = load_rsvps()
-    new_df = pd.DataFrame([rsvp_data])
-    df = pd.concat([df, new_df], ignore_index=True)
-    df.to_csv(CSV_FILE, index=False)
+    """Append a single RSVP row to the store"""
+    commit_rsvps([rsvp_data])
 
 def save_rsvps(df):
-    """Save entire RSVP dataframe to CSV file"""
-    df.to_csv(CSV_FILE, index=False)
+    """Replace the stored RSVP data with the given dataframe"""
+    get_store().replace(df)
+
+def save_rsvp_edits(updated, deleted, added):
+    """Apply data editor changes (keyed by rsvp_id) to the stored rows"""
+    get_store().apply_edits(updated, deleted, added)
+
+def export_rsvps(subset, export_format, event_name=None):
+    """An open file of an export ("all" or "attending" rows), generated once per data version
+
+    Download buttons call this after the script run has finished, outside the
+    session, so they must pass the event_name explicitly.
+    """
+    event = get_event(event_name)
+    store = get_store(event.name)
+    cache = _event_resource(event, ("exports", store.path), lambda: ExportCache(store))
+    return cache.get(subset, export_format)
+
+def get_party_rsvps(submission_id):
+    """Every guest row submitted together with one submission_id"""
+    return get_store().party(submission_id)
+
+def get_rsvp_summary():
+    """Contact, guest and dietary counts from the store's maintained counters"""
+    return get_store().summary()
+
+def get_choice_counts(column):
+    """Menu choice counts among attending guests from the store's maintained counters"""
+    return get_store().choice_counts(column)
+
+def get_dietary_requirements():
+    """Attending guests with dietary requirements, filtered by the store"""
+    return get_store().dietary_requirements()
+
+def get_recent_rsvps(limit=10, since=None):
+    """The most recent RSVP rows, newest first, with native column types
+
+    Rows come from the store's recent activity feed, so at most
+    RECENT_CAPACITY rows are available; since limits them to rows submitted
+    after that timestamp.
+    """
+    return typed_frame(get_store().recent(limit, since), get_config())
+
+def count_new_rsvps(since):
+    """Number of rows submitted after the timestamp since (at most RECENT_CAPACITY)"""
+    return get_store().count_since(since)
+
+def get_latest_rsvp_timestamp():
+    """Timestamp of the newest RSVP row, for the "since last visit" cursor"""
+    return get_store().latest_timestamp()
+
+def get_seen_cursor():
+    """Timestamp of the newest RSVP the event's admins have seen, or "" before their first visit"""
+    return get_store().seen_cursor()
+
+def mark_rsvps_seen(cursor):
+    """Record that the event's admins have seen the RSVPs up to the timestamp cursor"""
+    get_store().mark_seen(cursor)
+
+def search_rsvps(query):
+    """Row positions in load_rsvps() matching a name, email or phone search"""
+    return get_store().search(query)
 
 # Deadline utility functions
-def get_deadline_datetime():
-    """Get the deadline datetime from secrets configuration"""
-    try:
-        deadline_str = st.secrets["deadline"]["deadline_datetime"]
-        timezone_str = st.secrets["deadline"].get("timezone", "UTC")
+DeadlineStatus = namedtuple("DeadlineStatus", ["phase", "time_remaining"])
+
+class DeadlineWindow:
+    """The RSVP deadline with its warning period and admin grace period"""
+
+    # Phases returned by phase()
+    OPEN = "open"
+    WARNING = "warning"
+    GRACE = "grace"
+    CLOSED = "closed"
 
-        # Parse the deadline string
-        deadline_naive = datetime.strptime(deadline_str, "%Y-%m-%d %H:%M")
+    def __init__(self, deadline, warning_days=7, grace_period_hours=24):
+        self.deadline = deadline
+        self.warning_days = warning_days
+        self.grace_period_hours = grace_period_hours
+        self.warning_start = deadline - timedelta(days=warning_days)
+        self.grace_end = deadline + timedelta(hours=grace_period_hours)
 
-        # Add timezone
-        tz = pytz.timezone(timezone_str)
-        deadline_tz = tz.localize(deadline_naive)
+    def now(self):
+        """The current time in the deadline's timezone"""
+        return datetime.now(self.deadline.tzinfo)
 
-        return deadline_tz
+    def phase(self, now=None):
+        """Evaluate the phase and time remaining from a single clock read"""
+        if now is None:
+            now = self.now()
+
+        if now > self.deadline:
+            phase = self.GRACE if now <= self.grace_end else self.CLOSED
+            return DeadlineStatus(phase, timedelta(0))
+
+        phase = self.WARNING if now >= self.warning_start else self.OPEN
+        return DeadlineStatus(phase, self.deadline - now)
+
+def get_deadline_window():
+    """Get the DeadlineWindow for the current configuration, or None if it is invalid"""
+    event = get_event()
+    config = event.config_file.get()
+    # DeadlineWindow for the config version it was built from, so parsing happens once
+    version, window = event.resources.get("deadline_window", (None, None))
+    if version == config.version:
+        return window
+
+    deadline_config = config.deadline
+    try:
+        # Parse the deadline string and add the timezone
+        deadline_naive = datetime.strptime(deadline_config["deadline_datetime"], "%Y-%m-%d %H:%M")
+        deadline_tz = pytz.timezone(config.timezone).localize(deadline_naive)
     except Exception as e:
         st.error(f"Error parsing deadline configuration: {e}")
         return None
 
+    window = DeadlineWindow(
+        deadline_tz,
+        deadline_config.get("warning_days", 7),
+        deadline_config.get("grace_period_hours", 24)
+    )
+    event.resources["deadline_window"] = (config.version, window)
+    return window
+
+def get_deadline_datetime():
+    """Get the deadline datetime from secrets configuration"""
+    window = get_deadline_window()
+    return window.deadline if window else None
+
 def is_past_deadline():
     """Check if the current time is past the RSVP deadline"""
-    deadline = get_deadline_datetime()
-    if deadline is None:
-        return False
-
-    now = datetime.now(deadline.tzinfo)
-    return now > deadline
+    window = get_deadline_window()
+    return window is not None and window.phase().phase in (DeadlineWindow.GRACE, DeadlineWindow.CLOSED)
 
 def is_within_grace_period():
     """Check if we're within the admin grace period after deadline"""
-    if not is_past_deadline():
-        return False
-
-    deadline = get_deadline_datetime()
-    if deadline is None:
-        return False
-
-    grace_hours = st.secrets["deadline"].get("grace_period_hours", 24)
-    grace_period = timedelta(hours=grace_hours)
-
-    now = datetime.now(deadline.tzinfo)
-    return now <= (deadline + grace_period)
+    window = get_deadline_window()
+    return window is not None and window.phase().phase == DeadlineWindow.GRACE
 
 def is_within_warning_period():
     """Check if we're within the warning period before deadline"""
-    deadline = get_deadline_datetime()
-    if deadline is None:
-        return False
-
-    warning_days = st.secrets["deadline"].get("warning_days", 7)
-    warning_period = timedelta(days=warning_days)
-
-    now = datetime.now(deadline.tzinfo)
-    return (deadline - warning_period) <= now <= deadline
+    window = get_deadline_window()
+    return window is not None and window.phase().phase == DeadlineWindow.WARNING
 
 def get_time_until_deadline():
     """Get the time remaining until the deadline"""
-    deadline = get_deadline_datetime()
-    if deadline is None:
-        return None
-
-    now = datetime.now(deadline.tzinfo)
-    if now > deadline:
-        return timedelta(0)  # Past deadline
-
-    return deadline - now
+    window = get_deadline_window()
+    return window.phase().time_remaining if window else None
 
 def format_time_remaining(time_delta):
     """Format time remaining in a human-readable format"""
@@ -0,0 +1,159 @@
+import atexit
+import queue
+import threading
+import weakref
+from concurrent.futures import Future
+
+# Submissions waiting to be written; submit() blocks for up to ENQUEUE_TIMEOUT
+# seconds when this many are queued, then gives up with WriteQueueFull
+MAX_PENDING = 256
+
+# Most submissions written by one flush
+MAX_BATCH = 64
+
+ENQUEUE_TIMEOUT = 5.0
+
+# Seconds a session waits for its submission to be written
+ACK_TIMEOUT = 30.0
+
+# Seconds the writer thread waits for work before exiting; submit() starts it again
+IDLE_TIMEOUT = 60.0
+
+# Seconds drain_all() waits for each queue at interpreter exit
+DRAIN_TIMEOUT = 30.0
+
+# Queued after the last submission by close()
+_STOP = object()
+
+# Every queue with a live writer thread, drained at exit
+_queues = weakref.WeakSet()
+_queues_lock = threading.Lock()
+
+class WriteQueueFull(Exception):
+    """Raised by submit() when the queue stays full, so the caller can ask the guest to retry"""
+
+class WriteQueueClosed(Exception):
+    """Raised by submit() after close()"""
+
+class WriteQueue:
+    """Submissions for one store, written by a background thread in batches (group commit)
+
+    Every submission queued while a flush is running is written by the next
+    flush in one locked append, so concurrent guests share a single lock and
+    write. submit() returns a Future that resolves to the submission_id once
+    the rows are stored, or to the exception that stopped them.
+    """
+
+    def __init__(self, store, max_pending=MAX_PENDING, max_batch=MAX_BATCH):
+        self.store = store
+        self.max_batch = max_batch
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def submit(self, rsvp_rows, timeout=ENQUEUE_TIMEOUT):
+        """Queue the rows of one submission; returns a Future of its submission_id"""
+        if self._closed:
+            raise WriteQueueClosed("The write queue is closed")
+
+        future = Future()
+        try:
+            self._queue.put((rsvp_rows, future), timeout=timeout)
+        except queue.Full:
+            raise WriteQueueFull("Too many submissions are waiting to be saved")
+        self._ensure_thread()
+        return future
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"rsvp-writer {self.store.path}",
+                                                daemon=True)
+                self._thread.start()
+                with _queues_lock:
+                    _queues.add(self)
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=IDLE_TIMEOUT)
+            except queue.Empty:
+                with self._lock:
+                    # submit() starts a new thread if it queued something after this check
+                    if self._queue.empty():
+                        self._thread = None
+                        return
+                continue
+
+            batch = []
+            stop = False
+            while True:
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= self.max_batch:
+                    break
+                # Everything already waiting joins this flush
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._flush(batch)
+            if stop:
+                with self._lock:
+                    self._thread = None
+                return
+
+    def _flush(self, batch):
+        # Submissions cancelled by their caller before the flush are dropped
+        batch = [(rsvp_rows, future) for rsvp_rows, future in batch if future.set_running_or_notify_cancel()]
+        try:
+            submission_ids = self.store.append_submissions([rsvp_rows for rsvp_rows, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+        else:
+            for (_, future), submission_id in zip(batch, submission_ids):
+                future.set_result(submission_id)
+
+    def close(self, timeout=None):
+        """Stop accepting submissions and wait until the queued ones are written"""
+        self._closed = True
+        with self._lock:
+            thread = self._thread
+        if thread is None:
+            if self._queue.empty():
+                return
+            # Submissions queued after the thread exited: start one to write them
+            self._ensure_thread()
+            with self._lock:
+                thread = self._thread
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        if thread.is_alive():
+            return
+
+        # Submissions queued while the queue was closing are never written;
+        # fail them so their callers can submit them elsewhere
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(WriteQueueClosed("The write queue is closed"))
+
+def drain_all(timeout=DRAIN_TIMEOUT):
+    """Write every queued submission before the process exits"""
+    with _queues_lock:
+        write_queues = list(_queues)
+    for write_queue in write_queues:
+        write_queue.close(timeout)
+
+# Streamlit stops its server on SIGTERM and lets the interpreter exit, which
+# runs this before the daemon writer threads are stopped
+atexit.register(drain_all)